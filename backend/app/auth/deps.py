@@ -1,16 +1,59 @@
-from fastapi import Depends, HTTPException
+import hashlib
+import hmac
+import ipaddress
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from app.auth.jwt import decode_token
+from app.core.config import (
+    TOKEN_CACHE_SIZE,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ADMIN_USER_IDS,
+    METRICS_ALLOWED_NETWORKS,
+    METRICS_TOKEN,
+)
+from app.utils.ttl_cache import TTLCache
 from jose import JWTError
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+_metrics_networks = [ipaddress.ip_network(n, strict=False) for n in METRICS_ALLOWED_NETWORKS]
+
+# Verified tokens only, keyed by digest; an entry never outlives the token's exp
+token_cache = TTLCache(TOKEN_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# async: no blocking I/O here, so there is no reason to hop to the threadpool
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    key = hashlib.sha256(token.encode()).digest()
+    user_id = token_cache.get(key)
+    if user_id:
+        return user_id
+
     try:
         payload = decode_token(token)
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token payload")
+        if payload.get("exp"):
+            token_cache.set(key, user_id, expires_at=float(payload["exp"]))
         return user_id
     except JWTError as e:
         raise HTTPException(status_code=401, detail=str(e))
+
+
+def require_admin(user_id: str = Depends(get_current_user)):
+    if user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return user_id
+
+
+def require_metrics_access(request: Request):
+    """Scrapers have no user token: allow internal networks or a shared bearer token."""
+    auth = request.headers.get("authorization", "")
+    if METRICS_TOKEN and hmac.compare_digest(auth.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return
+    try:
+        client = ipaddress.ip_address(request.client.host if request.client else "")
+    except ValueError:
+        client = None
+    if client is None or not any(client in net for net in _metrics_networks):
+        raise HTTPException(status_code=403, detail="Forbidden")
@@ -1,13 +1,44 @@
 from fastapi import HTTPException
 from bson import ObjectId
 
+from app.core.config import LIBRARY_CACHE_SIZE, LIBRARY_CACHE_TTL_SECONDS
 from app.db.mongodb import libraries_collection
+from app.utils.ttl_cache import TTLCache, request_scope
 
-async def get_library_owned_by_user(library_id: str, user_id: str):
-    lib = await libraries_collection.find_one({
-        "_id": ObjectId(library_id),
-        "user_id": user_id
-    })
-    if not lib:
+# Only the ownership fact (library_id -> owner) is cached: it never changes
+# while the library exists. Anything mutable (name, is_public, deleting, the
+# change counters) is re-read by the code paths whose correctness depends on it.
+library_cache = TTLCache(LIBRARY_CACHE_SIZE, LIBRARY_CACHE_TTL_SECONDS)
+
+
+def invalidate_library(library_id):
+    library_id = str(library_id)
+    library_cache.pop(library_id)
+    scope = request_scope()
+    if scope is not None:
+        scope.pop(("library", library_id), None)
+
+
+async def get_library_owned_by_user(library_id: str, user_id: str) -> dict:
+    """Returns {"_id", "user_id"} for a library the user owns, else 403."""
+    scope = request_scope()
+    key = ("library", library_id)
+
+    owner = scope.get(key) if scope is not None else None
+    if owner is None:
+        owner = library_cache.get(library_id)
+    if owner is None:
+        lib = await libraries_collection.find_one(
+            {"_id": ObjectId(library_id), "deleting": {"$ne": True}},
+            {"user_id": 1}
+        )
+        if lib:
+            owner = lib["user_id"]
+            library_cache.set(library_id, owner)
+
+    if owner != user_id:
         raise HTTPException(403, "Access denied")
-    return lib
+
+    if scope is not None:
+        scope[key] = owner
+    return {"_id": ObjectId(library_id), "user_id": owner}
@@ -5,9 +5,66 @@ load_dotenv()
 
 #Mongo
 MONGO_URI = os.getenv("MONGO_URI")
-DB_NAME = "library"
+DB_NAME = os.getenv("DB_NAME", "library")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "10"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0")) or None
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0")) or None
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")  # e.g. "zstd,snappy,zlib"
+MONGO_READ_CONCERN = os.getenv("MONGO_READ_CONCERN")    # e.g. "local", "majority"
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+MONGO_WRITE_CONCERN_W = os.getenv("MONGO_WRITE_CONCERN_W")  # e.g. "1", "majority"
+MONGO_WRITE_CONCERN_JOURNAL = os.getenv("MONGO_WRITE_CONCERN_JOURNAL")  # "true" / "false"
+INDEX_RECONCILE_ON_STARTUP = os.getenv("INDEX_RECONCILE_ON_STARTUP", "create")  # create | check | off
+MONGO_TELEMETRY = os.getenv("MONGO_TELEMETRY", "true").lower() == "true"
 
 #Auth
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
\ No newline at end of file
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+
+ADMIN_USER_IDS = {u.strip() for u in os.getenv("ADMIN_USER_IDS", "").split(",") if u.strip()}
+# /metrics is for scrapers: allowed from these networks, or with this bearer token
+METRICS_ALLOWED_NETWORKS = [n.strip() for n in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128").split(",") if n.strip()]
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+#ISBN lookup
+ISBN_FETCH_CONCURRENCY = int(os.getenv("ISBN_FETCH_CONCURRENCY", "8"))
+ISBN_HTTP_TIMEOUT = float(os.getenv("ISBN_HTTP_TIMEOUT", "5"))
+ISBN_HTTP_MAX_CONNECTIONS = int(os.getenv("ISBN_HTTP_MAX_CONNECTIONS", "20"))
+ISBN_NEGATIVE_TTL_SECONDS = float(os.getenv("ISBN_NEGATIVE_TTL_SECONDS", "300"))
+ISBN_NEGATIVE_CACHE_SIZE = int(os.getenv("ISBN_NEGATIVE_CACHE_SIZE", "10000"))
+ISBN_PROVIDERS = [p.strip() for p in os.getenv("ISBN_PROVIDERS", "google_books,open_library").split(",") if p.strip()]
+GOOGLE_BOOKS_URL = os.getenv("GOOGLE_BOOKS_URL", "https://www.googleapis.com/books/v1/volumes")
+OPEN_LIBRARY_URL = os.getenv("OPEN_LIBRARY_URL", "https://openlibrary.org/api/books")
+ISBN_HEDGE_MIN_DELAY_MS = float(os.getenv("ISBN_HEDGE_MIN_DELAY_MS", "50"))
+ISBN_HEDGE_MAX_DELAY_MS = float(os.getenv("ISBN_HEDGE_MAX_DELAY_MS", "2000"))
+ISBN_BREAKER_FAILURES = int(os.getenv("ISBN_BREAKER_FAILURES", "5"))
+ISBN_BREAKER_RESET_SECONDS = float(os.getenv("ISBN_BREAKER_RESET_SECONDS", "30"))
+
+#Search
+TRIGRAM_INDEX_MEMORY_MB = float(os.getenv("TRIGRAM_INDEX_MEMORY_MB", "256"))
+TRIGRAM_MAX_CANDIDATES = int(os.getenv("TRIGRAM_MAX_CANDIDATES", "5000"))
+
+#Auth caches
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+LIBRARY_CACHE_SIZE = int(os.getenv("LIBRARY_CACHE_SIZE", "10000"))
+LIBRARY_CACHE_TTL_SECONDS = float(os.getenv("LIBRARY_CACHE_TTL_SECONDS", "30"))
+
+#Password hashing
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+#Slow-query recorder
+SLOW_QUERY_RECORDER = os.getenv("SLOW_QUERY_RECORDER", "false").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "600"))
+
+#Deletion jobs
+SYNC_DELETE_LIMIT = int(os.getenv("SYNC_DELETE_LIMIT", "1000"))
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", "500"))
+DELETE_CHUNK_PAUSE_MS = float(os.getenv("DELETE_CHUNK_PAUSE_MS", "50"))
+DELETE_JOB_STALE_SECONDS = float(os.getenv("DELETE_JOB_STALE_SECONDS", "120"))
+DELETE_JOB_MAX_ATTEMPTS = int(os.getenv("DELETE_JOB_MAX_ATTEMPTS", "3"))
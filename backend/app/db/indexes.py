@@ -0,0 +1,304 @@
+import logging
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.db.mongodb import db
+
+logger = logging.getLogger(__name__)
+
+## ---------------------------------------------------------------------------- ##
+## DECLARATIVE INDEX SPEC                                                       ##
+##                                                                              ##
+## INDEXES is the single source of truth. reconcile() compares it with what is  ##
+## in the database and reports drift:                                           ##
+##   missing  - in the spec, not in the db          (created unless dry run)    ##
+##   changed  - same name, different keys/options   (rebuild=True, migrations)  ##
+##   extra    - in the db, not in the spec          (dropped with drop_extra)   ##
+## audit() adds $indexStats usage, sizes and redundancy on top.                 ##
+##                                                                              ##
+## Runs at startup (INDEX_RECONCILE_ON_STARTUP) and from create_indexes.py.     ##
+## ---------------------------------------------------------------------------- ##
+
+INDEXES = {
+    # -------------------- users --------------------
+    "users": [
+        # Unique email (login)
+        IndexModel([("email", ASCENDING)], unique=True, name="users_email_idx"),
+        # Optional: created_at for listing/sorting users (admin usage)
+        IndexModel([("created_at", DESCENDING)], name="users_created_at_idx"),
+    ],
+
+    # -------------------- books (shared metadata) --------------------
+    "books": [
+        # Canonical ISBN-13 unique
+        IndexModel([("isbn_13", ASCENDING)], unique=True, name="books_isbn13_idx"),
+        # ISBN-10 is optional and stored as an explicit null when absent; a sparse
+        # index would still index those nulls and make every second one collide
+        IndexModel(
+            [("isbn_10", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"isbn_10": {"$type": "string"}},
+            name="books_isbn10_idx",
+        ),
+        # Text search index for global book metadata (title, authors, categories)
+        IndexModel([("title", TEXT), ("authors", TEXT), ("categories", TEXT)], name="books_text_idx"),
+        # Helpful single-field indexes for sorting / filtering
+        IndexModel([("title", ASCENDING)], name="books_title_idx"),
+        IndexModel([("published_year", DESCENDING)], name="books_published_year_idx"),
+        IndexModel([("updated_at", DESCENDING)], name="books_updated_at_idx"),
+    ],
+
+    # -------------------- user_books (per-user editable data) --------------------
+    "user_books": [
+        # Primary listing index: for cursor pagination by updated_at (user scope)
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)],
+                   name="ub_user_updated_idx"),
+        # Filter by genre / read_status within user scope
+        IndexModel([("user_id", ASCENDING), ("genres", ASCENDING)], name="ub_user_genres_idx"),
+        IndexModel([("user_id", ASCENDING), ("read_status", ASCENDING)], name="ub_user_readstatus_idx"),
+        # Sort by rating within user scope (_id is the keyset tie-breaker)
+        IndexModel([("user_id", ASCENDING), ("rating", DESCENDING), ("_id", DESCENDING)],
+                   name="ub_user_rating_idx"),
+        # Text search on the user-scoped search_blob
+        IndexModel([("user_id", ASCENDING), ("search_blob", TEXT)], name="ub_user_searchblob_text_idx"),
+        # Prefix search: distinct words of search_blob (see build_search_terms)
+        IndexModel([("user_id", ASCENDING), ("search_terms", ASCENDING)], name="ub_user_searchterms_idx"),
+        # One user_book per user per book
+        IndexModel([("user_id", ASCENDING), ("book_id", ASCENDING)], unique=True,
+                   name="ub_user_book_unique_idx"),
+        # Sort by title within user scope (book_title_sort, see book_display_fields)
+        IndexModel([("user_id", ASCENDING), ("book_title_sort", ASCENDING), ("_id", ASCENDING)],
+                   name="ub_user_booktitle_idx"),
+        # Library views: membership (library_ids) + each sort order of the view
+        IndexModel([("user_id", ASCENDING), ("library_ids", ASCENDING), ("updated_at", DESCENDING),
+                    ("_id", DESCENDING)], name="ub_user_library_updated_idx"),
+        IndexModel([("user_id", ASCENDING), ("library_ids", ASCENDING), ("rating", DESCENDING),
+                    ("_id", DESCENDING)], name="ub_user_library_rating_idx"),
+        IndexModel([("user_id", ASCENDING), ("library_ids", ASCENDING), ("book_title_sort", ASCENDING),
+                    ("_id", ASCENDING)], name="ub_user_library_title_idx"),
+        # Count books per user quickly
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="ub_user_created_idx"),
+    ],
+
+    # -------------------- libraries --------------------
+    "libraries": [
+        # Unique slug for public URLs (also serves the slug + is_public lookup)
+        IndexModel([("slug", ASCENDING)], unique=True, name="libs_slug_unique_idx"),
+        # One default library per user
+        IndexModel([("user_id", ASCENDING), ("is_default", ASCENDING)], unique=True,
+                   partialFilterExpression={"is_default": True}, name="libs_user_default_unique_idx"),
+        # Libraries of a user, sorted by updated_at (also every user_id-only lookup)
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING)], name="libs_user_updated_idx"),
+        # Public libraries by creation time (for listing popular/new)
+        IndexModel([("is_public", ASCENDING), ("created_at", DESCENDING)], name="libs_public_created_idx"),
+    ],
+
+    # -------------------- library_books (bridge library <-> user_book) --------------------
+    "library_books": [
+        # Books in a library by insertion time
+        IndexModel([("library_id", ASCENDING), ("added_at", DESCENDING)], name="lb_library_addedat_idx"),
+        # Libraries that contain a given user_book (fast delete or lookups)
+        IndexModel([("user_book_id", ASCENDING)], name="lb_userbook_idx"),
+        # A user_book appears only once per library; also serves library + user_book lookups
+        IndexModel([("library_id", ASCENDING), ("user_book_id", ASCENDING)], unique=True,
+                   name="lb_library_userbook_unique_idx"),
+    ],
+
+    # -------------------- public_library_items (public library snapshots) --------------------
+    "public_library_items": [
+        # One row per book of a public library (snapshot upserts)
+        IndexModel([("library_id", ASCENDING), ("user_book_id", ASCENDING)], unique=True,
+                   name="pli_library_userbook_unique_idx"),
+        # Page order of the public view (keyset on the row's own _id)
+        IndexModel([("library_id", ASCENDING), ("_id", ASCENDING)], name="pli_library_id_idx"),
+        # Refresh / remove a user_book across every snapshot holding it
+        IndexModel([("user_book_id", ASCENDING)], name="pli_userbook_idx"),
+    ],
+
+    # -------------------- deletion_jobs (background deletes) --------------------
+    "deletion_jobs": [
+        # Status lookups are by _id + owner; resume_stale_jobs scans unfinished jobs
+        IndexModel([("status", ASCENDING), ("heartbeat", ASCENDING)], name="dj_status_heartbeat_idx"),
+    ],
+}
+
+# Migrations: indexes whose definition changed under the same name. Drift on these
+# is rebuilt (drop + create) by the plain reconcile, startup included; any other
+# changed index still needs an explicit rebuild
+REBUILD_CHANGED = {
+    # _id appended to the key as the keyset tie-breaker
+    "user_books.ub_user_rating_idx",
+}
+
+# Options that change what an index is; anything else (v, ns, background) is ignored
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds", "weights", "collation")
+
+
+# -------------------- spec vs. database --------------------
+def _normalize(key_items, options: dict) -> dict:
+    """Key + identity-defining options of a spec or an existing index, comparable."""
+    key, text_fields = [], []
+    for field, kind in key_items:
+        if kind == TEXT or field in ("_fts", "_ftsx"):
+            # The server stores text keys as _fts/_ftsx with the fields in `weights`
+            if field not in ("_fts", "_ftsx"):
+                text_fields.append(field)
+            if ("_fts", "text") not in key:
+                key += [("_fts", "text"), ("_ftsx", 1)]
+            continue
+        key.append((field, int(kind) if isinstance(kind, (int, float)) else kind))
+
+    normalized = {"key": key}
+    for option in _COMPARED_OPTIONS:
+        value = options.get(option)
+        if option == "weights" and text_fields and not value:
+            value = {f: 1 for f in text_fields}
+        if value not in (None, False):
+            normalized[option] = value
+    return normalized
+
+
+def _spec(model: IndexModel) -> dict:
+    document = model.document
+    return _normalize(document["key"].items(), document)
+
+
+def _existing(info: dict) -> dict:
+    return {name: _normalize(details["key"], details) for name, details in info.items()}
+
+
+async def reconcile(dry_run: bool = False, rebuild: bool = False, drop_extra: bool = False) -> dict:
+    """
+    Bring the database in line with INDEXES. Only creates missing indexes and
+    rebuilds the REBUILD_CHANGED migrations, unless asked to rebuild every
+    changed index or drop extras. Returns the drift report.
+    """
+    report = {"created": [], "rebuilt": [], "dropped": [], "missing": [], "changed": [], "extra": []}
+
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = _existing(await collection.index_information())
+        wanted = {m.document["name"]: m for m in models}
+
+        to_create = []
+        for name, model in wanted.items():
+            spec = _spec(model)
+            if name not in existing:
+                report["missing"].append(f"{collection_name}.{name}")
+                to_create.append(model)
+            elif existing[name] != spec:
+                report["changed"].append({
+                    "index": f"{collection_name}.{name}",
+                    "spec": spec,
+                    "db": existing[name],
+                })
+                if (rebuild or f"{collection_name}.{name}" in REBUILD_CHANGED) and not dry_run:
+                    await collection.drop_index(name)
+                    to_create.append(model)
+                    report["rebuilt"].append(f"{collection_name}.{name}")
+
+        for name in existing:
+            if name != "_id_" and name not in wanted:
+                report["extra"].append(f"{collection_name}.{name}")
+                if drop_extra and not dry_run:
+                    await collection.drop_index(name)
+                    report["dropped"].append(f"{collection_name}.{name}")
+
+        if to_create and not dry_run:
+            # Since 4.2 every build is the optimized (non-blocking) kind
+            for model in to_create:
+                try:
+                    await collection.create_indexes([model])
+                    report["created"].append(f"{collection_name}.{model.document['name']}")
+                except OperationFailure as e:
+                    # e.g. same key already indexed under another name, or data violating `unique`
+                    report.setdefault("failed", []).append(
+                        {"index": f"{collection_name}.{model.document['name']}", "error": str(e)}
+                    )
+
+    return report
+
+
+async def reconcile_on_startup(mode: str):
+    """Startup hook: never drops anything, only logs what needs a human."""
+    try:
+        report = await reconcile(dry_run=(mode == "check"))
+    except Exception:
+        logger.exception("Index reconciliation failed")
+        return
+    for key in ("created", "rebuilt", "failed", "changed", "extra"):
+        if report.get(key):
+            logger.warning("Indexes %s: %s", key, report[key])
+    if mode == "check" and report["missing"]:
+        logger.warning("Indexes missing: %s", report["missing"])
+
+
+# -------------------- usage audit --------------------
+def _covers(longer: list, shorter: list) -> bool:
+    return len(shorter) <= len(longer) and longer[:len(shorter)] == shorter
+
+
+async def audit() -> dict:
+    """
+    $indexStats usage plus sizes per index. Flags:
+      unused     - no ops since the stats were reset (server restart / index rebuild)
+      redundant  - key is a prefix of another plain index on the same collection,
+                   or starts with _id (never reported for _id_ itself, nor for
+                   unique or TTL indexes: they enforce something beyond lookups)
+    Every index is written on every insert and on updates touching its fields,
+    so `write_cost` is the number of index entries one insert maintains.
+    """
+    result = {}
+    for collection_name in INDEXES:
+        collection = db[collection_name]
+        info = await collection.index_information()
+
+        usage = {
+            s["name"]: s
+            async for s in collection.aggregate([{"$indexStats": {}}])
+        }
+        sizes = {}
+        async for stats in collection.aggregate([{"$collStats": {"storageStats": {}}}]):
+            sizes = stats.get("storageStats", {}).get("indexSizes", {})
+
+        plain = {
+            name: list(details["key"])
+            for name, details in info.items()
+            if not any(k == "text" for _, k in details["key"])
+            and not details.get("sparse") and not details.get("partialFilterExpression")
+        }
+
+        indexes = []
+        for name, details in info.items():
+            stats = usage.get(name, {})
+            ops = stats.get("accesses", {}).get("ops", 0)
+            key = list(details["key"])
+            redundant_with = []
+            enforces = details.get("unique") or "expireAfterSeconds" in details
+            if name != "_id_" and name in plain and not enforces:
+                redundant_with = [
+                    other for other, other_key in plain.items()
+                    if other != name and _covers(other_key, key)
+                    and (len(other_key) > len(key) or other < name)
+                ]
+                # _id alone pins one document, so anything led by it adds nothing
+                if key[0][0] == "_id" and "_id_" not in redundant_with:
+                    redundant_with.append("_id_")
+            indexes.append({
+                "name": name,
+                "key": key,
+                "unique": bool(details.get("unique")),
+                "ops": ops,
+                "since": stats.get("accesses", {}).get("since"),
+                "size_bytes": sizes.get(name),
+                "unused": ops == 0 and name != "_id_" and not enforces,
+                "redundant_with": redundant_with,
+                "in_spec": name == "_id_" or any(m.document["name"] == name for m in INDEXES[collection_name]),
+            })
+
+        result[collection_name] = {
+            "write_cost": len(info),
+            "total_index_bytes": sum(v for v in sizes.values() if v),
+            "indexes": indexes,
+        }
+    return result
@@ -1,15 +1,70 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from app.core.config import MONGO_URI, DB_NAME
-
-client = AsyncIOMotorClient(
+from app.core.config import (
     MONGO_URI,
-    maxPoolSize=10,
-    serverSelectionTimeoutMS=5000
+    DB_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_COMPRESSORS,
+    MONGO_READ_CONCERN,
+    MONGO_READ_PREFERENCE,
+    MONGO_WRITE_CONCERN_W,
+    MONGO_WRITE_CONCERN_JOURNAL,
+    MONGO_TELEMETRY,
+    SLOW_QUERY_RECORDER,
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+)
+from app.db.telemetry import pool_telemetry, command_telemetry
+from app.utils.slow_queries import SlowQueryRecorder
+
+slow_query_recorder = (
+    SlowQueryRecorder(SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS)
+    if SLOW_QUERY_RECORDER else None
 )
 
+
+def client_options() -> dict:
+    """Client kwargs from config; unset options keep the driver / URI defaults."""
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+    }
+    if MONGO_MAX_IDLE_TIME_MS:
+        options["maxIdleTimeMS"] = MONGO_MAX_IDLE_TIME_MS
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    if MONGO_READ_CONCERN:
+        options["readConcernLevel"] = MONGO_READ_CONCERN
+    if MONGO_WRITE_CONCERN_W:
+        w = MONGO_WRITE_CONCERN_W
+        options["w"] = int(w) if w.isdigit() else w
+    if MONGO_WRITE_CONCERN_JOURNAL:
+        options["journal"] = MONGO_WRITE_CONCERN_JOURNAL.lower() == "true"
+    listeners = []
+    if MONGO_TELEMETRY:
+        listeners += [pool_telemetry, command_telemetry]
+    if slow_query_recorder:
+        listeners.append(slow_query_recorder)
+    if listeners:
+        options["event_listeners"] = listeners
+    return options
+
+
+client = AsyncIOMotorClient(MONGO_URI, **client_options())
+
 db = client[DB_NAME]
 books_collection = db.books
 users_collection = db.users
 user_books_collection = db.user_books
 libraries_collection = db.libraries
-library_books_collection = db.library_books
\ No newline at end of file
+library_books_collection = db.library_books
+public_library_items_collection = db.public_library_items
+slow_queries_collection = db.slow_queries
+deletion_jobs_collection = db.deletion_jobs
@@ -0,0 +1,172 @@
+import threading
+from collections import defaultdict, deque
+from pymongo import monitoring
+
+from app.utils.metrics import (
+    registry,
+    Gauge,
+    current_endpoint,
+    mongo_command_latency,
+    mongo_command_failures,
+    mongo_checkout_wait,
+)
+
+# pymongo calls these listeners from its own threads, hence the locks.
+# Durations are seconds; recent samples feed the percentiles.
+
+SAMPLE_SIZE = 1024
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    ordered = sorted(samples)
+    pick = lambda pct: round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000, 2)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+class PoolTelemetry(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = defaultdict(int)
+        self.pool_clears = 0
+        self.wait_samples = deque(maxlen=SAMPLE_SIZE)
+        self.wait_total = 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures[str(event.reason)] += 1
+            self.wait_samples.append(event.duration)
+            self.wait_total += event.duration
+        mongo_checkout_wait.observe(event.duration)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.checkouts += 1
+            self.wait_samples.append(event.duration)
+            self.wait_total += event.duration
+        mongo_checkout_wait.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pool_clears": self.pool_clears,
+                "checkout_wait_total_s": round(self.wait_total, 3),
+                "checkout_wait": _percentiles(self.wait_samples),
+            }
+
+
+class CommandTelemetry(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.failures = defaultdict(int)
+        self.total = defaultdict(float)
+        self.samples = defaultdict(lambda: deque(maxlen=SAMPLE_SIZE))
+        self._inflight: dict = {}  # (connection_id, request_id) -> (collection, endpoint)
+
+    def started(self, event):
+        # Motor runs commands with a copy of the caller's context, so the
+        # endpoint is visible here; the reply events do not carry the command
+        command = event.command
+        collection = command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = command.get("collection")
+        if not isinstance(collection, str):
+            collection = "-"
+        with self._lock:
+            self._inflight[(event.connection_id, event.request_id)] = (collection, current_endpoint())
+
+    def _record(self, event, failed: bool):
+        seconds = event.duration_micros / 1e6
+        with self._lock:
+            collection, endpoint = self._inflight.pop(
+                (event.connection_id, event.request_id), ("-", current_endpoint())
+            )
+        mongo_command_latency.observe(seconds, event.command_name, collection, endpoint)
+        if failed:
+            mongo_command_failures.inc(event.command_name, collection, endpoint)
+
+        with self._lock:
+            name = event.command_name
+            self.counts[name] += 1
+            self.total[name] += seconds
+            self.samples[name].append(seconds)
+            if failed:
+                self.failures[name] += 1
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "count": self.counts[name],
+                    "failures": self.failures[name],
+                    "total_s": round(self.total[name], 3),
+                    **_percentiles(self.samples[name]),
+                }
+                for name in sorted(self.counts)
+            }
+
+
+pool_telemetry = PoolTelemetry()
+command_telemetry = CommandTelemetry()
+
+registry.register(Gauge("mongodb_pool_connections_open", "Open pooled connections", lambda: pool_telemetry.open))
+registry.register(Gauge("mongodb_pool_connections_in_use", "Checked-out connections", lambda: pool_telemetry.in_use))
+registry.register(Gauge("mongodb_pool_waiters", "Operations waiting for a connection", lambda: pool_telemetry.waiting))
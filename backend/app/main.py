@@ -1,10 +1,39 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routes import books, isbn, auth, libraries, library_books, public_url
-from app.db.mongodb import books_collection
+from app.routes import books, isbn, auth, libraries, library_books, public_url, admin, jobs
+from app.core.config import INDEX_RECONCILE_ON_STARTUP
+from app.db.mongodb import books_collection, slow_query_recorder
+from app.db.indexes import reconcile_on_startup
+from app.utils.deletion_jobs import sweep_stale_jobs
+from app.utils.http_client import close_http_client
+from app.utils.auth import hashing_pool
+from app.db.telemetry import pool_telemetry, command_telemetry
+from app.utils.ttl_cache import RequestScopeMiddleware
+from app.utils.metrics import MetricsMiddleware, registry
+from app.auth.deps import token_cache, require_admin, require_metrics_access
+from app.auth.permissions import library_cache
 
-app = FastAPI(title="Library Management API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if slow_query_recorder:
+        slow_query_recorder.attach(asyncio.get_running_loop())
+    # In the background: index builds must not hold up serving
+    if INDEX_RECONCILE_ON_STARTUP != "off":
+        app.state.index_task = asyncio.create_task(reconcile_on_startup(INDEX_RECONCILE_ON_STARTUP))
+    # Deletion jobs orphaned by a dead worker or task, now and periodically
+    app.state.job_sweeper = asyncio.create_task(sweep_stale_jobs())
+    yield
+    app.state.job_sweeper.cancel()
+    await close_http_client()
+    hashing_pool.shutdown()
+
+
+app = FastAPI(title="Library Management API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,13 +43,41 @@ app.add_middleware(
     allow_headers=["*"],            # allow all headers
 )
 
+app.add_middleware(RequestScopeMiddleware)
+# Outermost, so the timings include every other middleware
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth.router)
 app.include_router(books.router)
 app.include_router(isbn.router)
 app.include_router(libraries.router)
 app.include_router(library_books.router)
 app.include_router(public_url.router)
+app.include_router(admin.router)
+app.include_router(jobs.router)
 
 @app.get("/")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/stats/caches", dependencies=[Depends(require_admin)])
+async def cache_stats():
+    return {
+        "tokens": token_cache.stats(),
+        "libraries": library_cache.stats(),
+        "password_hashing": hashing_pool.stats(),
+    }
+
+
+@app.get("/stats/mongo", dependencies=[Depends(require_admin)])
+async def mongo_stats():
+    return {
+        "pool": pool_telemetry.stats(),
+        "commands": command_telemetry.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -18,3 +18,11 @@ class BookCreate(BookBase):
 
 class BookInDB(BookBase):
     id: str
+
+class IsbnBatchLookup(BaseModel):
+    isbns: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=50,
+        example=["9780132350884", "0132350882"]
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 class LibraryBookInDB(BaseModel):
@@ -12,3 +12,11 @@ class LibraryBooksCreate(BaseModel):
 
 class LibraryBooksRemove(BaseModel):
     user_book_ids: list[str]
+
+class LibraryMembershipPair(BaseModel):
+    library_id: str
+    user_book_id: str
+
+class LibraryMembershipBulk(BaseModel):
+    add: list[LibraryMembershipPair] = Field(default=[], max_length=5000)
+    remove: list[LibraryMembershipPair] = Field(default=[], max_length=5000)
@@ -26,4 +26,12 @@ class UserBookInDB(UserBookBase):
     updated_at: datetime
 
 class UserBooksDelete(BaseModel):
-    user_book_ids: list[str]
\ No newline at end of file
+    # Large deletions store the id list on one deletion_jobs document (16MB cap);
+    # 50k ObjectIds is about 1MB
+    user_book_ids: list[str] = Field(..., max_length=50_000)
+
+class UserBookBulkItem(UserBookCreate):
+    isbn: str = Field(..., example="9780132350884")
+
+class UserBooksBulkCreate(BaseModel):
+    items: List[UserBookBulkItem] = Field(..., min_length=1, max_length=1000)
@@ -0,0 +1,16 @@
+from app.core.config import ISBN_PROVIDERS, ISBN_HEDGE_MIN_DELAY_MS, ISBN_HEDGE_MAX_DELAY_MS
+from .base import MetadataProvider, ProviderResponseError, ProviderUnavailable, build_book_doc
+from .google_books import GoogleBooksProvider
+from .open_library import OpenLibraryProvider
+from .hedged import HedgedLookup
+
+PROVIDERS = {
+    GoogleBooksProvider.name: GoogleBooksProvider,
+    OpenLibraryProvider.name: OpenLibraryProvider,
+}
+
+metadata_lookup = HedgedLookup(
+    [PROVIDERS[name]() for name in ISBN_PROVIDERS],
+    min_delay=ISBN_HEDGE_MIN_DELAY_MS / 1000,
+    max_delay=ISBN_HEDGE_MAX_DELAY_MS / 1000,
+)
@@ -0,0 +1,117 @@
+import re
+import time
+import httpx
+from collections import deque
+from typing import Optional
+from datetime import datetime, timezone
+
+from app.core.config import ISBN_BREAKER_FAILURES, ISBN_BREAKER_RESET_SECONDS
+
+
+class ProviderResponseError(ValueError):
+    """The provider answered, but not with anything we can parse."""
+
+
+class ProviderUnavailable(Exception):
+    """Every configured provider is currently skipped by its circuit breaker."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures.
+    open -> half-open after `reset_timeout` seconds; one trial call decides
+    whether it closes again or re-opens.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release(self):
+        # Call was abandoned (e.g. lost a hedge); neither success nor failure
+        self._trial_running = False
+
+
+class MetadataProvider:
+    """
+    A book metadata source. `fetch` returns normalized metadata:
+    title, authors, publisher, published_year, description, categories, cover_url
+    or None when the provider does not know the ISBN.
+    """
+
+    name = "provider"
+
+    def __init__(self, url: str):
+        self.url = url
+        self.breaker = CircuitBreaker(ISBN_BREAKER_FAILURES, ISBN_BREAKER_RESET_SECONDS)
+        self.latencies = deque(maxlen=200)
+
+    async def fetch(self, client: httpx.AsyncClient, isbn_13: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def p95_latency(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def stats(self) -> dict:
+        p95 = self.p95_latency()
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "samples": len(self.latencies),
+        }
+
+
+def parse_year(value) -> Optional[int]:
+    # "2008", "2008-03-01" and "March 2008" all carry a 4 digit year
+    match = re.search(r"\d{4}", str(value)) if value else None
+    return int(match.group()) if match else None
+
+
+def build_book_doc(isbn: str, isbn_13: str, meta: dict) -> dict:
+    return {
+        "isbn_13": isbn_13,
+        "isbn_10": isbn if len(isbn) == 10 else None,
+        "title": meta.get("title"),
+        "authors": meta.get("authors", []),
+        "publisher": meta.get("publisher"),
+        "published_year": meta.get("published_year"),
+        "description": meta.get("description"),
+        "categories": meta.get("categories", []),
+        "cover_url": meta.get("cover_url"),
+        "created_at": datetime.now(timezone.utc),
+    }
@@ -0,0 +1,34 @@
+import httpx
+from typing import Optional
+
+from app.core.config import GOOGLE_BOOKS_URL
+from .base import MetadataProvider, ProviderResponseError, parse_year
+
+
+class GoogleBooksProvider(MetadataProvider):
+    name = "google_books"
+
+    def __init__(self, url: str = GOOGLE_BOOKS_URL):
+        super().__init__(url)
+
+    async def fetch(self, client: httpx.AsyncClient, isbn_13: str) -> Optional[dict]:
+        res = await client.get(self.url, params={"q": f"isbn:{isbn_13}"})
+        res.raise_for_status()
+
+        try:
+            data = res.json()
+            if data.get("totalItems", 0) == 0:
+                return None
+            info = data["items"][0]["volumeInfo"]
+        except (KeyError, IndexError, ValueError, AttributeError):
+            raise ProviderResponseError("Invalid response from Google Books")
+
+        return {
+            "title": info.get("title"),
+            "authors": info.get("authors", []),
+            "publisher": info.get("publisher"),
+            "published_year": parse_year(info.get("publishedDate")),
+            "description": info.get("description"),
+            "categories": info.get("categories", []),
+            "cover_url": info.get("imageLinks", {}).get("thumbnail"),
+        }
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from app.utils.http_client import get_http_client
+from app.utils.metrics import isbn_provider_latency
+from .base import MetadataProvider, ProviderUnavailable
+
+
+class HedgedLookup:
+    """
+    Asks providers in order. If the current provider has not answered within
+    its p95 latency (clamped to [min_delay, max_delay]) the next one is started
+    as well, and the first usable answer wins. Errors and "not found" answers
+    fall through to the next provider. Providers whose circuit is open are
+    skipped entirely.
+    """
+
+    def __init__(self, providers: List[MetadataProvider], min_delay: float, max_delay: float):
+        self.providers = providers
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+
+    def hedge_delay(self, provider: MetadataProvider) -> float:
+        p95 = provider.p95_latency()
+        if p95 is None:
+            return self.max_delay
+        return min(max(p95, self.min_delay), self.max_delay)
+
+    async def _call(self, provider: MetadataProvider, isbn_13: str) -> Optional[dict]:
+        started = time.monotonic()
+        try:
+            result = await provider.fetch(get_http_client(), isbn_13)
+        except asyncio.CancelledError:
+            provider.breaker.release()
+            isbn_provider_latency.observe(time.monotonic() - started, provider.name, "cancelled")
+            raise
+        except Exception:
+            provider.breaker.record_failure()
+            isbn_provider_latency.observe(time.monotonic() - started, provider.name, "error")
+            raise
+        elapsed = time.monotonic() - started
+        provider.latencies.append(elapsed)
+        provider.breaker.record_success()
+        isbn_provider_latency.observe(elapsed, provider.name, "ok" if result is not None else "not_found")
+        return result
+
+    async def lookup(self, isbn_13: str) -> Optional[dict]:
+        candidates = iter(self.providers)
+        pending: dict = {}  # task -> provider
+        last_error: Optional[Exception] = None
+        not_found = False
+
+        def start_next() -> Optional[MetadataProvider]:
+            # Ask the breaker only when we actually want to call the provider,
+            # so a half-open trial slot is never claimed and left unused
+            for provider in candidates:
+                if provider.breaker.allow():
+                    pending[asyncio.ensure_future(self._call(provider, isbn_13))] = provider
+                    return provider
+            return None
+
+        current = start_next()
+        if current is None:
+            raise ProviderUnavailable("All metadata providers are unavailable")
+
+        try:
+            while pending:
+                timeout = self.hedge_delay(current) if current else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Slow provider: hedge with the next one (if any is left)
+                    current = start_next()
+                    continue
+
+                for task in done:
+                    pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if result is not None:
+                        return result
+                    not_found = True
+
+                # Nothing usable yet: replace the finished call with the next provider
+                current = start_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if not_found:
+            return None
+        raise last_error
@@ -0,0 +1,50 @@
+import httpx
+from typing import Optional
+
+from app.core.config import OPEN_LIBRARY_URL
+from .base import MetadataProvider, ProviderResponseError, parse_year
+
+
+def _names(items) -> list:
+    return [i["name"] for i in items or [] if isinstance(i, dict) and i.get("name")]
+
+
+class OpenLibraryProvider(MetadataProvider):
+    """Open Library Books API (`/api/books?bibkeys=ISBN:...&jscmd=data`)."""
+
+    name = "open_library"
+
+    def __init__(self, url: str = OPEN_LIBRARY_URL):
+        super().__init__(url)
+
+    async def fetch(self, client: httpx.AsyncClient, isbn_13: str) -> Optional[dict]:
+        key = f"ISBN:{isbn_13}"
+        res = await client.get(
+            self.url,
+            params={"bibkeys": key, "format": "json", "jscmd": "data"}
+        )
+        res.raise_for_status()
+
+        try:
+            data = res.json()
+            if not data:
+                return None
+            info = data[key]
+        except (KeyError, ValueError, TypeError):
+            raise ProviderResponseError("Invalid response from Open Library")
+
+        description = info.get("notes") or info.get("description")
+        if isinstance(description, dict):
+            description = description.get("value")
+
+        publishers = _names(info.get("publishers"))
+
+        return {
+            "title": info.get("title"),
+            "authors": _names(info.get("authors")),
+            "publisher": publishers[0] if publishers else None,
+            "published_year": parse_year(info.get("publish_date")),
+            "description": description,
+            "categories": _names(info.get("subjects"))[:10],
+            "cover_url": (info.get("cover") or {}).get("medium"),
+        }
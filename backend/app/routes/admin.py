@@ -0,0 +1,54 @@
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+
+from app.auth.deps import require_admin
+from app.db.mongodb import slow_queries_collection, slow_query_recorder
+from app.db.indexes import reconcile, audit
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/slow-queries")
+async def list_slow_queries(
+    sort: str = Query("max_ms", pattern="^(max_ms|total_ms|count|last_seen)$"),
+    collection: Optional[str] = None,
+    collscan: Optional[bool] = None,
+    blocking_sort: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    query: dict = {}
+    if collection:
+        query["collection"] = collection
+    if collscan is not None:
+        query["explain.collscan"] = collscan
+    if blocking_sort is not None:
+        query["explain.blocking_sort"] = blocking_sort
+
+    items = []
+    async for doc in slow_queries_collection.find(query).sort(sort, -1).limit(limit):
+        doc["fingerprint"] = doc.pop("_id")
+        doc["shape"] = json.loads(doc["shape"])
+        doc["avg_ms"] = round(doc["total_ms"] / doc["count"], 1)
+        items.append(doc)
+
+    return {
+        "enabled": slow_query_recorder is not None,
+        "threshold_ms": slow_query_recorder.threshold_ms if slow_query_recorder else None,
+        "items": items,
+    }
+
+
+@router.delete("/slow-queries")
+async def clear_slow_queries():
+    res = await slow_queries_collection.delete_many({})
+    return {"deleted": res.deleted_count}
+
+
+@router.get("/indexes")
+async def index_report(include_audit: bool = True):
+    # Dry run: drift only, nothing is created or dropped from here
+    return {
+        "drift": await reconcile(dry_run=True),
+        "audit": await audit() if include_audit else None,
+    }
@@ -1,17 +1,26 @@
 from fastapi import APIRouter, HTTPException
 from app.db.mongodb import users_collection
-from app.utils.auth import hash_password, verify_password
+from app.utils.auth import hash_password, verify_password, HashingPoolBusy
 from app.auth.jwt import create_access_token
 from app.models.user import User
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+
+def _pool_busy():
+    # Shed load instead of letting logins queue behind each other
+    return HTTPException(503, "Too many concurrent logins, retry shortly", headers={"Retry-After": "1"})
+
+
 @router.post("/register")
 async def register(data: User):
     if await users_collection.find_one({"email": data.email.lower()}):
         raise HTTPException(400, "User exists")
 
-    hashed = hash_password(data.password)
+    try:
+        hashed = await hash_password(data.password)
+    except HashingPoolBusy:
+        raise _pool_busy()
     await users_collection.insert_one({
         "email": data.email.lower(),
         "password": hashed
@@ -23,9 +32,23 @@ async def register(data: User):
 @router.post("/login")
 async def login(data: User):
     user = await users_collection.find_one({"email": data.email.lower()})
-    if not user or not verify_password(data.password, user["password"]):
+    if not user:
         raise HTTPException(401, "Invalid credentials")
 
+    try:
+        valid, new_hash = await verify_password(data.password, user["password"])
+    except HashingPoolBusy:
+        raise _pool_busy()
+    if not valid:
+        raise HTTPException(401, "Invalid credentials")
+
+    # Work factor or scheme changed since this hash was written
+    if new_hash:
+        await users_collection.update_one(
+            {"_id": user["_id"], "password": user["password"]},
+            {"$set": {"password": new_hash}}
+        )
+
     token = create_access_token({"user_id": str(user["_id"])})
     return {"access_token": token, "token_type": "bearer"}
 
@@ -1,16 +1,148 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from typing import Optional
 from datetime import datetime, timezone
 from bson import ObjectId
-import re
-from app.db.mongodb import books_collection, user_books_collection, library_books_collection
-from app.models.user_books import UserBookCreate, UserBookUpdate, UserBooksDelete
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from app.db.mongodb import books_collection, user_books_collection, library_books_collection, libraries_collection
+from app.models.user_books import UserBookCreate, UserBookUpdate, UserBooksDelete, UserBooksBulkCreate
 from app.auth.deps import get_current_user
 from app.utils.isbn import normalize_isbn
-from app.utils.search import build_search_blob
+from app.core.config import SYNC_DELETE_LIMIT
+from app.utils.trigram_index import trigram_indexes
+from app.utils.deletion_jobs import tombstone_user_books, create_job, start_job
+from app.utils.denormalize import book_display_fields
+from app.utils.public_snapshots import refresh_user_books, remove_user_books
+from app.utils.versions import (
+    touch_user_books,
+    bump_user_version,
+    bump_library_versions,
+    get_user_version,
+    make_etag,
+    etag_matches,
+)
+from app.utils.pagination import keyset_page_stages, next_page_cursor
+from app.utils.projection import VIEW_PATTERN, resolve_fields, user_book_projection, book_lookup_stages
+from app.utils.search import (
+    SEARCH_MODE_PATTERN,
+    build_search_blob,
+    build_search_terms,
+    build_search_match,
+    resolve_search_mode,
+    is_scored,
+)
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
+def _user_book_upsert(user_id: str, book: dict, data: dict, now: datetime) -> tuple:
+    """(filter, update) that adds the book to the user's collection or refreshes it."""
+    search_blob = build_search_blob(book, data)
+
+    return (
+        {"user_id": user_id, "book_id": book["_id"]},
+        {
+            "$set": {
+                **data,
+                **book_display_fields(book),
+                "search_blob": search_blob,
+                "search_terms": build_search_terms(search_blob)
+                },
+            "$setOnInsert": {
+                "user_id": user_id,
+                "book_id": book["_id"],
+                "created_at": now
+            },
+            # Re-adding a book that is being deleted in the background keeps it
+            "$unset": {"deleting": ""},
+            "$currentDate": {"updated_at": True}
+        }
+    )
+
+
+@router.post("/bulk")
+async def add_books_to_library_bulk(
+    data: UserBooksBulkCreate,
+    user_id: str = Depends(get_current_user)
+):
+    results = []
+    isbn_13s = []
+
+    # 1️⃣ Normalize ISBNs
+    for item in data.items:
+        try:
+            isbn_13 = normalize_isbn(item.isbn)
+        except Exception:
+            results.append({"isbn": item.isbn, "status": "invalid"})
+            isbn_13s.append(None)
+            continue
+        results.append({"isbn": item.isbn})
+        isbn_13s.append(isbn_13)
+
+    # 2️⃣ Resolve every book in one $in query
+    wanted = [i for i in isbn_13s if i]
+    books = {}
+    if wanted:
+        async for book in books_collection.find({"isbn_13": {"$in": wanted}}):
+            books[book["isbn_13"]] = book
+
+    # 3️⃣ Build all upserts in memory (last item wins for a repeated ISBN)
+    now = datetime.now(timezone.utc)
+    op_index = {}  # isbn_13 -> position in ops
+    ops = []
+    for item, isbn_13, result in zip(data.items, isbn_13s, results):
+        if isbn_13 is None:
+            continue
+        book = books.get(isbn_13)
+        if not book:
+            result["status"] = "not_found"
+            continue
+
+        op = UpdateOne(
+            *_user_book_upsert(user_id, book, item.model_dump(exclude={"isbn"}), now),
+            upsert=True
+        )
+        if isbn_13 in op_index:
+            ops[op_index[isbn_13]] = op
+        else:
+            op_index[isbn_13] = len(ops)
+            ops.append(op)
+
+    # 4️⃣ Apply them in one unordered bulk_write
+    upserted, failed = set(), set()
+    if ops:
+        try:
+            res = await user_books_collection.bulk_write(ops, ordered=False)
+            upserted = set(res.upserted_ids)
+        except BulkWriteError as e:
+            upserted = {u["index"] for u in e.details.get("upserted", [])}
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+
+        touched = [books[i]["_id"] for i in op_index]
+
+        # Keep a loaded trigram index in step (updated docs have no _id in the result)
+        if trigram_indexes.is_loaded(user_id):
+            async for doc in user_books_collection.find(
+                {"user_id": user_id, "book_id": {"$in": touched}},
+                {"search_blob": 1}
+            ):
+                trigram_indexes.upsert(user_id, doc["_id"], doc["search_blob"])
+
+        await refresh_user_books({"user_id": user_id, "book_id": {"$in": touched}})
+        await touch_user_books(user_id, {"book_id": {"$in": touched}})
+
+    for isbn_13, result in zip(isbn_13s, results):
+        if "status" in result:
+            continue
+        index = op_index[isbn_13]
+        if index in failed:
+            result["status"] = "error"
+        else:
+            result["status"] = "added" if index in upserted else "updated"
+
+    return {"count": len(results), "results": results}
+
+
 @router.post("/{isbn}")
 async def add_book_to_library(
     isbn: str,
@@ -24,54 +156,67 @@ async def add_book_to_library(
         raise HTTPException(404, "Book not found. Lookup ISBN first.")
 
     now = datetime.now(timezone.utc)
-    
-    search_blob = build_search_blob(book, data.model_dump())
 
-    await user_books_collection.update_one(
-        {"user_id": user_id, "book_id": book["_id"]},
-        {
-            "$set": {
-                **data.model_dump(),
-                "search_blob": search_blob
-                },
-            "$setOnInsert": {
-                "user_id": user_id,
-                "book_id": book["_id"],
-                "created_at": now
-            },
-            "$currentDate": {"updated_at": True}
-        },
-        upsert=True
+    query, update = _user_book_upsert(user_id, book, data.model_dump(), now)
+    user_book = await user_books_collection.find_one_and_update(
+        query,
+        update,
+        upsert=True,
+        projection={"_id": 1},
+        return_document=ReturnDocument.AFTER
     )
+    trigram_indexes.upsert(user_id, user_book["_id"], update["$set"]["search_blob"])
+    await refresh_user_books({"_id": user_book["_id"]})
+    await touch_user_books(user_id, {"_id": user_book["_id"]})
 
     return {"message": "Book added to library"}
 
 
 @router.get("")
 async def list_user_books(
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user),
 
     # Filters
     q: Optional[str] = None,
+    # Default keeps the original substring meaning of `q`; indexed modes are opt-in
+    search_mode: str = Query("substring", pattern=SEARCH_MODE_PATTERN),
     genre: Optional[str] = None,
     read_status: Optional[str] = None,
     min_rating: Optional[int] = None,
 
     # Pagination & sorting
     limit: int = Query(20, ge=1, le=50),
-    sort: str = Query("updated_at", pattern="^(updated_at|rating|title)$"),
+    sort: str = Query("updated_at", pattern="^(updated_at|rating|title|relevance)$"),
     order: str = Query("desc", pattern="^(asc|desc)$"),
     cursor: Optional[str] = None,
+
+    # Response shape
+    view: Optional[str] = Query(None, pattern=VIEW_PATTERN),
+    fields: Optional[str] = None,
 ):
-    match: dict = {"user_id": user_id}
-
-    # 🔍 Search (uses search_blob)
-    if q:
-        escaped = re.escape(q.strip().lower())
-        match["search_blob"] = {
-            "$regex": escaped,
-            "$options": "i"
-        }
+    selection = resolve_fields(view, fields)
+
+    # 🏷 Conditional GET: one counter read before any aggregation
+    version = await get_user_version(user_id)
+    etag = make_etag(f"books-{user_id}", version, request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    # Tombstoned rows are hidden while a background deletion works through them
+    match: dict = {"user_id": user_id, "deleting": {"$ne": True}}
+
+    # 🔍 Search (substring by default, text/prefix are opt-in; see build_search_match)
+    mode = resolve_search_mode(q, search_mode) if q else None
+    if mode == "contains":
+        match.update(await trigram_indexes.search_match(user_id, q, version))
+    elif q:
+        match.update(build_search_match(q, mode))
+
+    if sort == "relevance" and not is_scored(mode):
+        raise HTTPException(400, "sort=relevance needs a text or phrase search")
 
     if genre:
         match["genres"] = genre
@@ -82,58 +227,47 @@ async def list_user_books(
     if min_rating is not None:
         match["rating"] = {"$gte": min_rating}
 
-    # ⏱ Cursor pagination
-    if cursor:
-        cursor_dt = datetime.fromisoformat(cursor)
-        match["updated_at"] = {"$lt": cursor_dt}
-
-    direction = -1 if order == "desc" else 1
-
     pipeline = [
         {"$match": match},
 
-        # Join books
-        {
-            "$lookup": {
-                "from": "books",
-                "localField": "book_id",
-                "foreignField": "_id",
-                "as": "book"
-            }
-        },
-        {"$unwind": "$book"},
-
-        # Sorting (special case for title)
-        {
-            "$sort": {
-                "book.title" if sort == "title" else sort: direction,
-                "_id": direction
-            }
-        },
-
-        # Pagination
-        {"$limit": limit + 1},
+        # 🔀 Sort + ⏱ keyset page on user_books alone, so the supporting index
+        # serves the page and only the final page is joined with books
+        *keyset_page_stages(sort, order, cursor, limit),
+
+        # Denormalized copies are for sorting/search; the joined book is returned
+        {"$project": user_book_projection(selection, sort) if selection else {
+            "search_terms": 0,
+            "book_title": 0,
+            "book_authors": 0,
+            "book_cover_url": 0,
+            "library_ids": 0
+        }},
+
+        # Join books (page only), projected to the selected fields
+        *book_lookup_stages(selection),
     ]
 
-    cursor_db = user_books_collection.aggregate(pipeline)
+    docs = await user_books_collection.aggregate(pipeline).to_list(length=None)
+    next_cursor = next_page_cursor(docs, limit, sort, order)
 
     items = []
-    async for doc in cursor_db:
+    for doc in docs:
+        # Dangling rows are kept until the cursor is computed, so a page is never cut short
+        if "book" not in doc:
+            continue
+
         doc["user_book_id"] = str(doc["_id"])
         doc["book"]["id"] = str(doc["book"]["_id"])
         doc["book_id"] = str(doc["book_id"])
 
         del doc["_id"]
         del doc["book"]["_id"]
-        del doc["user_id"]
+        doc.pop("user_id", None)
+        doc.pop("_score", None)
+        doc.pop("book_title_sort", None)
 
         items.append(doc)
 
-    next_cursor = None
-    if len(items) > limit:
-        last = items.pop()
-        next_cursor = last["updated_at"].isoformat()
-
     return {
         "items": items,
         "next_cursor": next_cursor,
@@ -153,7 +287,8 @@ async def update_user_book(
     # 1️⃣ Get existing user-book doc
     user_book = await user_books_collection.find_one({
         "_id": oid,
-        "user_id": user_id
+        "user_id": user_id,
+        "deleting": {"$ne": True}
     })
 
     if not user_book:
@@ -182,8 +317,16 @@ async def update_user_book(
 
         await user_books_collection.update_one(
             {"_id": oid},
-            {"$set": {"search_blob": search_blob}}
+            {"$set": {
+                **book_display_fields(book),
+                "search_blob": search_blob,
+                "search_terms": build_search_terms(search_blob)
+            }}
         )
+        trigram_indexes.upsert(user_id, oid, search_blob)
+
+    await refresh_user_books({"_id": oid})
+    await touch_user_books(user_id, {"_id": oid})
 
     return {"message": "Book updated"}
 
@@ -196,11 +339,37 @@ async def delete_books_globally(
 ):
     ids = [ObjectId(i) for i in user_book_ids.user_book_ids]
 
-    await library_books_collection.delete_many(
-        {"user_book_id": {"$in": ids}}
-    )
-    await user_books_collection.delete_many(
-        {"_id": {"$in": ids}, "user_id": user_id}
-    )
+    # 🪦 Large deletions: hide now, delete in chunks in the background
+    if len(ids) > SYNC_DELETE_LIMIT:
+        await tombstone_user_books(user_id, ids)
+        await touch_user_books(user_id, {"_id": {"$in": ids}})
+        job_id = await create_job("user_books", user_id, ids, total=len(ids))
+        start_job(job_id)
+        return JSONResponse(
+            status_code=202,
+            content={"message": "Deletion started", "job_id": str(job_id)}
+        )
+
+    # Only ids the caller owns go any further; library_ids are read before
+    # the delete and bumped after it (see versions.py)
+    owned, library_ids = [], set()
+    async for doc in user_books_collection.find(
+        {"_id": {"$in": ids}, "user_id": user_id}, {"library_ids": 1}
+    ):
+        owned.append(doc["_id"])
+        library_ids.update(doc.get("library_ids", []))
+
+    if owned:
+        user_library_ids = await libraries_collection.distinct("_id", {"user_id": user_id})
+        await library_books_collection.delete_many(
+            {"user_book_id": {"$in": owned}, "library_id": {"$in": user_library_ids}}
+        )
+        await user_books_collection.delete_many(
+            {"_id": {"$in": owned}, "user_id": user_id}
+        )
+        trigram_indexes.delete(user_id, owned)
+        await remove_user_books(user_id, owned)
+        await bump_library_versions(library_ids)
+    await bump_user_version(user_id)
 
     return {"message": "Books deleted from all libraries"}
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+import asyncio
 import httpx
 from app.db.mongodb import books_collection
+from app.models.book import IsbnBatchLookup
+from app.core.config import ISBN_FETCH_CONCURRENCY
+from app.auth.deps import get_current_user, require_admin
 from app.utils.isbn import normalize_isbn
-from datetime import datetime, timezone
+from app.providers import ProviderResponseError, ProviderUnavailable
+from app.utils.isbn_resolver import isbn_resolver
 
 router = APIRouter(prefix="/isbn", tags=["ISBN"])
 
 
+def _serialize_book(book: dict) -> dict:
+    book = dict(book)
+    book["id"] = str(book.pop("_id"))
+    return book
+
+
 @router.get("", dependencies=[])
 async def lookup_isbn(isbn: str):
     # 1️⃣ Normalize ISBN
@@ -15,66 +26,91 @@ async def lookup_isbn(isbn: str):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid ISBN format")
 
-    # 2️⃣ Check local DB
-    try:
-        book = await books_collection.find_one({"isbn_13": isbn_13})
-    except Exception:
-        raise HTTPException(status_code=500, detail="Database error")
-
-    if book:
-        book["id"] = str(book["_id"])
-        del book["_id"]
-        return book
-
-    # 3️⃣ Fetch from Google Books
+    # 2️⃣ Resolve through the cache (DB → coalesced provider fetch → upsert)
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            res = await client.get(
-                "https://www.googleapis.com/books/v1/volumes",
-                params={"q": f"isbn:{isbn_13}"}
-            )
-            res.raise_for_status()
+        book = await isbn_resolver.resolve(isbn, isbn_13)
+    except ProviderUnavailable:
+        raise HTTPException(status_code=503, detail="Book metadata providers unavailable")
     except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="Google Books timeout")
+        raise HTTPException(status_code=504, detail="Book metadata provider timeout")
     except httpx.HTTPStatusError:
-        raise HTTPException(status_code=502, detail="Google Books error")
+        raise HTTPException(status_code=502, detail="Book metadata provider error")
+    except ProviderResponseError:
+        raise HTTPException(status_code=502, detail="Invalid response from book metadata provider")
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to fetch book data")
 
-    # 4️⃣ Parse response
-    try:
-        data = res.json()
-        if data.get("totalItems", 0) == 0:
-            raise HTTPException(status_code=404, detail="ISBN not found")
-
-        info = data["items"][0]["volumeInfo"]
-    except (KeyError, IndexError, ValueError):
-        raise HTTPException(status_code=502, detail="Invalid response from Google Books")
-
-    # 5️⃣ Build document
-    book_doc = {
-        "isbn_13": isbn_13,
-        "isbn_10": isbn if len(isbn) == 10 else None,
-        "title": info.get("title"),
-        "authors": info.get("authors", []),
-        "publisher": info.get("publisher"),
-        "published_year": (
-            int(info.get("publishedDate", "0")[:4])
-            if info.get("publishedDate")
-            else None
-        ),
-        "description": info.get("description"),
-        "categories": info.get("categories", []),
-        "cover_url": info.get("imageLinks", {}).get("thumbnail"),
-        "created_at": datetime.now(timezone.utc),
-    }
-
-    # 6️⃣ Insert into DB
-    try:
-        result = await books_collection.insert_one(book_doc)
-        book_doc["id"] = str(result.inserted_id)
-        book_doc.pop("_id", None)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Failed to save book data. Try again later.")
+    if not book:
+        raise HTTPException(status_code=404, detail="ISBN not found")
+
+    return _serialize_book(book)
+
+
+@router.get("/stats", dependencies=[Depends(require_admin)])
+async def isbn_cache_stats():
+    return isbn_resolver.stats()
+
+
+# Authenticated: each call can fan out to one provider fetch per ISBN
+@router.post("/batch", dependencies=[Depends(get_current_user)])
+async def lookup_isbn_batch(data: IsbnBatchLookup):
+    results = []
+    wanted: dict = {}  # isbn_13 -> first raw isbn that produced it
+
+    # 1️⃣ Normalize all ISBNs (duplicates share one lookup)
+    for raw in data.isbns:
+        try:
+            isbn_13 = normalize_isbn(raw)
+        except Exception:
+            results.append({"isbn": raw, "status": "invalid"})
+            continue
+        wanted.setdefault(isbn_13, raw)
+        results.append({"isbn": raw, "isbn_13": isbn_13})
+
+    # 2️⃣ One $in query for everything already cached locally
+    known: dict = {}
+    if wanted:
+        try:
+            async for book in books_collection.find({"isbn_13": {"$in": list(wanted)}}):
+                known[book["isbn_13"]] = _serialize_book(book)
+        except Exception:
+            raise HTTPException(status_code=500, detail="Database error")
+
+    # 3️⃣ Fetch the rest concurrently through the resolver, so the batch shares
+    # single-flight fetches, the negative cache and the upsert with GET /isbn
+    semaphore = asyncio.Semaphore(ISBN_FETCH_CONCURRENCY)
+    statuses = {isbn_13: "found" for isbn_13 in known}
+
+    async def fetch(isbn_13: str):
+        async with semaphore:
+            try:
+                book = await isbn_resolver.fetch(wanted[isbn_13], isbn_13)
+            except Exception:
+                statuses[isbn_13] = "error"
+                return
+        if book is None:
+            statuses[isbn_13] = "not_found"
+        else:
+            statuses[isbn_13] = "fetched"
+            known[isbn_13] = _serialize_book(book)
+
+    missing = []
+    for isbn_13 in wanted:
+        if isbn_13 in known:
+            continue
+        if isbn_resolver.is_known_missing(isbn_13):
+            isbn_resolver.negative_hits += 1
+            statuses[isbn_13] = "not_found"
+            continue
+        missing.append(isbn_13)
+    await asyncio.gather(*(fetch(i) for i in missing))
+
+    # 4️⃣ One result per requested ISBN, in request order
+    for item in results:
+        if item.get("status") == "invalid":
+            continue
+        isbn_13 = item["isbn_13"]
+        item["status"] = statuses.get(isbn_13, "error")
+        item["book"] = known.get(isbn_13)
 
-    return book_doc
+    return {"count": len(results), "results": results}
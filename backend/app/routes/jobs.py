@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.auth.deps import get_current_user
+from app.utils.deletion_jobs import get_job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+async def job_status(
+    job_id: str,
+    user_id: str = Depends(get_current_user)
+):
+    job = await get_job(job_id, user_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+
+    total = job["total"]
+    return {
+        "id": str(job["_id"]),
+        "kind": job["kind"],
+        "status": job["status"],
+        "total": total,
+        "deleted": job["deleted"],
+        # Rows added after the count are swept too, so cap the estimate
+        "progress": 100.0 if job["status"] == "done" else (
+            min(99.9, round(job["deleted"] * 100 / total, 1)) if total else 0.0
+        ),
+        "error": job.get("error"),
+        "attempts": job.get("attempts", 0),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
@@ -1,13 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from datetime import datetime, timezone
 from uuid import uuid4
 from slugify import slugify
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo import ReturnDocument
 
 from app.models.library import LibraryCreate, LibraryUpdate
 from app.auth.deps import get_current_user
+from app.auth.permissions import invalidate_library
+from app.core.config import SYNC_DELETE_LIMIT
+from app.utils.deletion_jobs import tombstone_library, delete_library_now, create_job, start_job
 from app.db.mongodb import libraries_collection, library_books_collection
+from app.utils.public_snapshots import rebuild_library_snapshot, drop_library_snapshot, bump_versions
+from app.utils.versions import (
+    bump_user_version,
+    bump_library_versions,
+    get_user_version,
+    make_etag,
+    etag_matches,
+)
 
 
 router = APIRouter(prefix="/library", tags=["library"])
@@ -31,12 +44,23 @@ async def create_library(
     }
 
     await libraries_collection.insert_one(library)
+    await bump_user_version(user_id)
     return {"message": "Library created", "slug": slug}
 
 
 @router.get("")
-async def list_libraries(user_id: str = Depends(get_current_user)):
-    cursor = libraries_collection.find({"user_id": user_id})
+async def list_libraries(
+    request: Request,
+    response: Response,
+    user_id: str = Depends(get_current_user)
+):
+    # 🏷 Conditional GET on the user's change counter
+    etag = make_etag(f"libraries-{user_id}", await get_user_version(user_id), request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    cursor = libraries_collection.find({"user_id": user_id, "deleting": {"$ne": True}})
     libs = []
 
     async for lib in cursor:
@@ -59,22 +83,36 @@ async def edit_library(
     if not updates:
         raise HTTPException(400, "No fields to update")
 
-    result = await libraries_collection.update_one(
+    lib = await libraries_collection.find_one_and_update(
         {
             "_id": ObjectId(library_id),
             "user_id": user_id,
-            "is_default": False
+            "is_default": False,
+            "deleting": {"$ne": True}
         },
         {
             "$set": {
                 **updates,
                 "updated_at": datetime.now(timezone.utc)
             }
-        }
+        },
+        return_document=ReturnDocument.AFTER
     )
 
-    if result.matched_count == 0:
+    if not lib:
         raise HTTPException(404, "Library not found or cannot edit default")
+    invalidate_library(lib["_id"])
+
+    # Keep the public snapshot in step with visibility / name
+    if not lib["is_public"]:
+        await drop_library_snapshot(lib["_id"])
+    elif "is_public" in updates or not lib.get("snapshot_version"):
+        await rebuild_library_snapshot(lib)
+    else:
+        await bump_versions([lib["_id"]])
+
+    await bump_library_versions([lib["_id"]])
+    await bump_user_version(user_id)
 
     return {"message": "Library updated"}
 
@@ -90,8 +128,9 @@ async def delete_library(
         raise HTTPException(status_code=400, detail="Invalid library ID")
     
     lib = await libraries_collection.find_one({
-        "_id": ObjectId(library_id),
-        "user_id": user_id
+        "_id": library_oid,
+        "user_id": user_id,
+        "deleting": {"$ne": True}
     })
 
     if not lib:
@@ -99,7 +138,21 @@ async def delete_library(
     if lib["is_default"]:
         raise HTTPException(400, "Default library cannot be deleted")
 
-    await library_books_collection.delete_many({"library_id": lib["_id"]})
-    await libraries_collection.delete_one({"_id": lib["_id"]})
+    # 🪦 Large libraries: hide now, delete in chunks in the background
+    total = await library_books_collection.count_documents({"library_id": lib["_id"]})
+    if total > SYNC_DELETE_LIMIT:
+        await tombstone_library(lib)
+        invalidate_library(lib["_id"])
+        await bump_user_version(user_id)
+        job_id = await create_job("library", user_id, lib["_id"], total=total)
+        start_job(job_id)
+        return JSONResponse(
+            status_code=202,
+            content={"message": "Library deletion started", "job_id": str(job_id)}
+        )
+
+    await delete_library_now(lib)
+    invalidate_library(lib["_id"])
+    await bump_user_version(user_id)
 
     return {"message": "Library deleted"}
@@ -1,18 +1,56 @@
-from fastapi import APIRouter, Depends, status, Query, HTTPException
+from fastapi import APIRouter, Depends, status, Query, HTTPException, Request, Response
 from datetime import datetime
 from bson import ObjectId
+from bson.errors import InvalidId
 from typing import Optional
-import re
+from collections import defaultdict
+from pymongo import InsertOne, DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
 
-from app.models.library_books import LibraryBooksCreate, LibraryBooksRemove
+from app.models.library_books import LibraryBooksCreate, LibraryBooksRemove, LibraryMembershipBulk
 from app.auth.permissions import get_library_owned_by_user
 from app.auth.deps import get_current_user
-from app.db.mongodb import library_books_collection, libraries_collection
-from app.utils.find_missing_ids import find_missing_ids
+from app.db.mongodb import library_books_collection, libraries_collection, user_books_collection
+from app.utils.find_missing_ids import find_missing_ids, membership_matrix
 from app.utils.to_object_id import to_object_ids
+from app.utils.trigram_index import trigram_indexes
+from app.utils.search import (
+    SEARCH_MODE_PATTERN,
+    build_search_match,
+    resolve_search_mode,
+    is_scored,
+)
+from app.utils.pagination import keyset_page_stages, next_page_cursor
+from app.utils.public_snapshots import add_to_snapshot, remove_from_snapshot
+from app.utils.projection import VIEW_PATTERN, resolve_fields, user_book_projection, book_lookup_stages
+from app.utils.versions import (
+    bump_user_version,
+    bump_library_versions,
+    get_library_header,
+    get_user_version,
+    make_etag,
+    etag_matches,
+)
 
 router = APIRouter(prefix="/librarybooks", tags=["library_books"])
 
+DUPLICATE_KEY = 11000
+MEMBERSHIP_MATRIX_MAX_IDS = 200
+
+async def _user_libraries(user_id: str) -> list:
+    # libs_user_updated_idx; a user has tens of libraries, not thousands
+    return await libraries_collection.find(
+        {"user_id": user_id, "deleting": {"$ne": True}}
+    ).to_list(length=None)
+
+
+async def _live_user_book_ids(user_id: str, user_book_ids: list) -> set:
+    """The ids the caller owns that are not tombstoned by a pending deletion."""
+    return set(await user_books_collection.distinct(
+        "_id", {"_id": {"$in": user_book_ids}, "user_id": user_id, "deleting": {"$ne": True}}
+    ))
+
+
 @router.get("/missing-libraries")
 async def get_missing_library_ids(
     user_book_id: str = Query(...),
@@ -22,41 +60,16 @@ async def get_missing_library_ids(
         raise HTTPException(status_code=400, detail="Invalid user_book_id")
 
     user_book_obj_id = ObjectId(user_book_id)
+    if not await _live_user_book_ids(user_id, [user_book_obj_id]):
+        raise HTTPException(404, "Book not found")
 
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "library_books",
-                "let": {"libraryId": "$_id"},
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                "$and": [
-                                    {"$eq": ["$library_id", "$$libraryId"]},
-                                    {"$eq": ["$user_book_id", user_book_obj_id]}
-                                ]
-                            }
-                        }
-                    }
-                ],
-                "as": "book_match"
-            }
-        },
-        {
-            "$match": {
-                "user_id": user_id,
-                "book_match": {"$size": 0}
-            }
-        },
-        {
-            "$project": {
-                "book_match": 0
-            }
-        }
-    ]
-
-    missing_libraries = await libraries_collection.aggregate(pipeline).to_list(length=None)
+    # The caller's libraries first, then one probe over just those
+    libs = await _user_libraries(user_id)
+    matrix = await membership_matrix(
+        [lib["_id"] for lib in libs], [user_book_obj_id], library_books_collection
+    )
+    member_of = set(matrix[user_book_obj_id])
+    missing_libraries = [lib for lib in libs if lib["_id"] not in member_of]
 
     for lib in missing_libraries:
         lib["_id"] = str(lib["_id"])
@@ -67,6 +80,132 @@ async def get_missing_library_ids(
     }
 
 
+@router.get("/membership")
+async def get_membership_matrix(
+    request: Request,
+    response: Response,
+    user_book_ids: list[str] = Query(...),
+    user_id: str = Depends(get_current_user)
+):
+    """For a page of user books, which of the caller's libraries hold each one."""
+    if len(user_book_ids) > MEMBERSHIP_MATRIX_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MEMBERSHIP_MATRIX_MAX_IDS} user_book_ids per call")
+    ub_ids = list(dict.fromkeys(to_object_ids(user_book_ids)))
+
+    # 🏷 Membership writes bump the user's change counter
+    etag = make_etag(f"membership-{user_id}", await get_user_version(user_id), request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    libs = await _user_libraries(user_id)
+    # Tombstoned (or foreign) books are listed with no libraries
+    live = await _live_user_book_ids(user_id, ub_ids)
+    matrix = await membership_matrix(
+        [lib["_id"] for lib in libs], [i for i in ub_ids if i in live], library_books_collection
+    )
+
+    return {
+        "libraries": [
+            {
+                "id": str(lib["_id"]),
+                "name": lib["name"],
+                "slug": lib.get("slug"),
+                "is_default": lib.get("is_default", False),
+                "is_public": lib.get("is_public", False),
+            }
+            for lib in libs
+        ],
+        "memberships": {
+            str(ub_id): [str(lib_id) for lib_id in lib_ids]
+            for ub_id, lib_ids in matrix.items()
+        } | {str(ub_id): [] for ub_id in ub_ids if ub_id not in live},
+    }
+
+
+# Declared before /{library_id} so "bulk" is not taken for a library id
+@router.post("/bulk")
+async def bulk_update_membership(
+    data: LibraryMembershipBulk,
+    user_id: str = Depends(get_current_user)
+):
+    try:
+        pairs = {
+            kind: {(ObjectId(p.library_id), ObjectId(p.user_book_id)) for p in items}
+            for kind, items in (("add", data.add), ("remove", data.remove))
+        }
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid ObjectId format")
+    if pairs["add"] & pairs["remove"]:
+        raise HTTPException(status_code=400, detail="A pair cannot be both added and removed")
+
+    all_pairs = pairs["add"] | pairs["remove"]
+    if not all_pairs:
+        return {"message": "Membership updated", "added": 0, "removed": 0}
+    library_ids = {lib_id for lib_id, _ in all_pairs}
+    user_book_ids = {ub_id for _, ub_id in all_pairs}
+
+    # 1️⃣ Ownership: one $in per side
+    libs = {
+        lib["_id"]: lib
+        async for lib in libraries_collection.find(
+            {"_id": {"$in": list(library_ids)}, "user_id": user_id, "deleting": {"$ne": True}},
+            {"user_id": 1, "is_public": 1}
+        )
+    }
+    if len(libs) != len(library_ids):
+        raise HTTPException(403, "Access denied")
+    owned = await user_books_collection.count_documents(
+        {"_id": {"$in": list(user_book_ids)}, "user_id": user_id, "deleting": {"$ne": True}}
+    )
+    if owned != len(user_book_ids):
+        raise HTTPException(404, "Book not found")
+
+    # 2️⃣ Bridge rows in one unordered write; the unique index skips existing pairs
+    now = datetime.utcnow()
+    ops = [
+        InsertOne({"library_id": lib_id, "user_book_id": ub_id, "added_at": now})
+        for lib_id, ub_id in pairs["add"]
+    ] + [
+        DeleteOne({"library_id": lib_id, "user_book_id": ub_id})
+        for lib_id, ub_id in pairs["remove"]
+    ]
+    try:
+        res = (await library_books_collection.bulk_write(ops, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        if any(err["code"] != DUPLICATE_KEY for err in e.details["writeErrors"]):
+            raise
+        res = e.details
+
+    # 3️⃣ Mirror membership onto user_books (read by the library view)
+    added, removed = defaultdict(list), defaultdict(list)
+    for lib_id, ub_id in pairs["add"]:
+        added[ub_id].append(lib_id)
+    for lib_id, ub_id in pairs["remove"]:
+        removed[ub_id].append(lib_id)
+    await user_books_collection.bulk_write([
+        UpdateOne({"_id": ub_id}, {"$addToSet": {"library_ids": {"$each": ids}}})
+        for ub_id, ids in added.items()
+    ] + [
+        UpdateOne({"_id": ub_id}, {"$pull": {"library_ids": {"$in": ids}}})
+        for ub_id, ids in removed.items()
+    ], ordered=False)
+
+    # 4️⃣ Public snapshots and change counters
+    by_library = defaultdict(lambda: {"add": [], "remove": []})
+    for kind in ("add", "remove"):
+        for lib_id, ub_id in pairs[kind]:
+            by_library[lib_id][kind].append(ub_id)
+    for lib_id, changes in by_library.items():
+        if changes["add"]:
+            await add_to_snapshot(libs[lib_id], changes["add"])
+        if changes["remove"]:
+            await remove_from_snapshot(libs[lib_id], changes["remove"])
+    await bump_library_versions(library_ids)
+    await bump_user_version(user_id)
+
+    return {"message": "Membership updated", "added": res["nInserted"], "removed": res["nRemoved"]}
+
 
 @router.post("/{library_id}", status_code=status.HTTP_201_CREATED)
 async def add_books_to_library(
@@ -93,142 +232,133 @@ async def add_books_to_library(
     
     if ops:
         await library_books_collection.insert_many(ops, ordered=False)
+
+    # Mirror membership onto user_books (read by the library view)
+    await user_books_collection.update_many(
+        {"_id": {"$in": to_object_ids(data.user_book_ids)}, "user_id": user_id},
+        {"$addToSet": {"library_ids": lib["_id"]}}
+    )
+    await add_to_snapshot(lib, to_object_ids(data.user_book_ids))
+    await bump_library_versions([lib["_id"]])
+    await bump_user_version(user_id)
     return {"message": "Books added"}
 
 
 @router.get("/{library_id}")
 async def view_library_books(
     library_id: str,
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user),
     
     # Filters
     q: Optional[str] = None,
+    # Default keeps the original substring meaning of `q`; indexed modes are opt-in
+    search_mode: str = Query("substring", pattern=SEARCH_MODE_PATTERN),
     genre: Optional[str] = None,
     read_status: Optional[str] = None,
     min_rating: Optional[int] = None,
 
     # Pagination & sorting
     limit: int = Query(20, ge=1, le=50),
-    sort: str = Query("updated_at", pattern="^(updated_at|rating|title)$"),
+    sort: str = Query("updated_at", pattern="^(updated_at|rating|title|relevance)$"),
     order: str = Query("desc", pattern="^(asc|desc)$"),
     cursor: Optional[str] = None,
+
+    # Response shape
+    view: Optional[str] = Query(None, pattern=VIEW_PATTERN),
+    fields: Optional[str] = None,
 ):
+    selection = resolve_fields(view, fields)
     lib = await get_library_owned_by_user(library_id, user_id)
 
-    direction = -1 if order == "desc" else 1
-
-    # Base match (library scope)
-    match: dict = {
-        "library_id": lib["_id"]
-    }
-
-    pipeline = [
-        {"$match": match},
-
-        # 🔗 Join user_books
-        {
-            "$lookup": {
-                "from": "user_books",
-                "localField": "user_book_id",
-                "foreignField": "_id",
-                "as": "user_book"
-            }
-        },
-        {"$unwind": "$user_book"},
-    ]
-
-    # 🔍 Filters on user_books
-    user_book_match = {"user_book.user_id": user_id}
-
-    if q:
-        escaped = re.escape(q.strip().lower())
-        user_book_match["user_book.search_blob"] = {
-            "$regex": escaped,
-            "$options": "i"
-        }
+    # 🏷 Conditional GET: ownership may come from cache; name, visibility and the
+    # counter are read fresh (renames and visibility changes bump the counter)
+    header = await get_library_header(lib["_id"])
+    if not header:
+        raise HTTPException(404, "Library not found")
+    etag = make_etag(f"library-{lib['_id']}", header.get("data_version", 0), request)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    mode = resolve_search_mode(q, search_mode) if q else None
+    if sort == "relevance" and not is_scored(mode):
+        raise HTTPException(400, "sort=relevance needs a text or phrase search")
+
+    # Library scope lives on user_books.library_ids, so the whole view is one
+    # indexed query on user_books (ub_user_library_*_idx)
+    match: dict = {"user_id": user_id, "library_ids": lib["_id"], "deleting": {"$ne": True}}
+
+    # 🔍 Filters
+    if mode == "contains":
+        match.update(await trigram_indexes.search_match(user_id, q))
+    elif q:
+        match.update(build_search_match(q, mode))
 
     if genre:
-        user_book_match["user_book.genres"] = genre
+        match["genres"] = genre
 
     if read_status:
-        user_book_match["user_book.read_status"] = read_status
+        match["read_status"] = read_status
 
     if min_rating is not None:
-        user_book_match["user_book.rating"] = {"$gte": min_rating}
-
-    # ⏱ Cursor pagination (based on user_book.updated_at)
-    if cursor:
-        cursor_dt = datetime.fromisoformat(cursor)
-        user_book_match["user_book.updated_at"] = {"$lt": cursor_dt}
-
-    pipeline.append({"$match": user_book_match})
-
-    # 🔗 Join books
-    pipeline.extend([
-        {
-            "$lookup": {
-                "from": "books",
-                "localField": "user_book.book_id",
-                "foreignField": "_id",
-                "as": "book"
-            }
-        },
-        {"$unwind": "$book"},
-    ])
-
-    # 🔀 Sorting
-    sort_field = (
-        "book.title"
-        if sort == "title"
-        else f"user_book.{sort}"
-    )
+        match["rating"] = {"$gte": min_rating}
 
-    pipeline.extend([
-        {
-            "$sort": {
-                sort_field: direction,
-                "_id": direction
-            }
-        },
+    pipeline = [
+        {"$match": match},
 
-        # 📄 Pagination
-        {"$limit": limit + 1},
-    ])
+        # 🔀 Sorting + 📄 keyset pagination
+        *keyset_page_stages(sort, order, cursor, limit),
 
-    cursor_db = library_books_collection.aggregate(pipeline)
+        # ✂️ Selected fields only, before the join
+        *([{"$project": user_book_projection(selection, sort)}] if selection else []),
+
+        # 🔗 Join books (page only)
+        *book_lookup_stages(selection),
+    ]
+
+    docs = await user_books_collection.aggregate(pipeline).to_list(length=None)
+    next_cursor = next_page_cursor(docs, limit, sort, order)
 
     items = []
-    async for doc in cursor_db:
+    for doc in docs:
+        if "book" not in doc:
+            continue
+
         book = dict(doc["book"])
         book["id"] = str(book["_id"])
         del book["_id"]
 
+        if selection:
+            items.append({
+                "user_book_id": str(doc["_id"]),
+                "book": book,
+                **{f: doc.get(f) for f in sorted(selection[0])},
+            })
+            continue
+
         items.append({
-            "user_book_id": str(doc["user_book"]["_id"]),
+            "user_book_id": str(doc["_id"]),
 
             # global book
             "book": book,
 
             # user editable
-            "genres": doc["user_book"]["genres"],
-            "tags": doc["user_book"]["tags"],
-            "rating": doc["user_book"]["rating"],
-            "read_status": doc["user_book"]["read_status"],
-            "personal_notes": doc["user_book"].get("personal_notes"),
-            "updated_at": doc["user_book"]["updated_at"],
+            "genres": doc["genres"],
+            "tags": doc["tags"],
+            "rating": doc["rating"],
+            "read_status": doc["read_status"],
+            "personal_notes": doc.get("personal_notes"),
+            "updated_at": doc["updated_at"],
         })
 
-    next_cursor = None
-    if len(items) > limit:
-        last = items.pop()
-        next_cursor = last["updated_at"].isoformat()
-
     return {
         "library": {
             "id": str(lib["_id"]),
-            "name": lib["name"],
-            "is_public": lib["is_public"],
-            "is_default": lib["is_default"],
+            "name": header["name"],
+            "is_public": header["is_public"],
+            "is_default": header["is_default"],
         },
         "books": items,
         "next_cursor": next_cursor,
@@ -244,10 +374,19 @@ async def remove_books_from_library(
 ):
     lib = await get_library_owned_by_user(library_id, user_id)
 
+    user_book_ids = [ObjectId(i) for i in data.user_book_ids]
+
     await library_books_collection.delete_many({
         "library_id": lib["_id"],
-        "user_book_id": {"$in": [ObjectId(i) for i in data.user_book_ids]}
+        "user_book_id": {"$in": user_book_ids}
     })
+    await user_books_collection.update_many(
+        {"_id": {"$in": user_book_ids}, "user_id": user_id},
+        {"$pull": {"library_ids": lib["_id"]}}
+    )
+    await remove_from_snapshot(lib, user_book_ids)
+    await bump_library_versions([lib["_id"]])
+    await bump_user_version(user_id)
 
     return {"message": "Books removed from library"}
 
@@ -1,49 +1,68 @@
-from fastapi import HTTPException, APIRouter
+import hashlib
+from typing import Optional
+from fastapi import HTTPException, APIRouter, Query, Request, Response
 
-from app.db.mongodb import libraries_collection, library_books_collection
+from app.db.mongodb import libraries_collection, public_library_items_collection
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.public_snapshots import ensure_library_snapshot
+from app.utils.versions import etag_matches
 
 router = APIRouter(prefix="", tags=["public_library"])
 
+
+def _etag(library_id, version: int, cursor: Optional[str], limit: int) -> str:
+    page = hashlib.sha1(f"{cursor}|{limit}".encode()).hexdigest()[:10]
+    return f'"{library_id}-{version}-{page}"'
+
+
 @router.get("/public/library/{slug}")
-async def view_public_library(slug: str):
-    lib = await libraries_collection.find_one({"slug": slug, "is_public": True})
+async def view_public_library(
+    slug: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    lib = await libraries_collection.find_one(
+        {"slug": slug, "is_public": True},
+        {"name": 1, "user_id": 1, "is_public": 1, "snapshot_version": 1}
+    )
     if not lib:
         raise HTTPException(404, "Library not found")
 
-    pipeline = [
-        {"$match": {"library_id": lib["_id"]}},
-        {
-            "$lookup": {
-                "from": "user_books",
-                "localField": "user_book_id",
-                "foreignField": "_id",
-                "as": "user_book"
-            }
-        },
-        {"$unwind": "$user_book"},
-        {
-            "$lookup": {
-                "from": "books",
-                "localField": "user_book.book_id",
-                "foreignField": "_id",
-                "as": "book"
-            }
-        },
-        {"$unwind": "$book"}
-    ]
-
-    cursor = library_books_collection.aggregate(pipeline)
-    results = []
-
-    async for doc in cursor:
-        results.append({
-            "title": doc["book"]["title"],
-            "authors": doc["book"]["authors"],
-            "cover_url": doc["book"].get("cover_url"),
-            "genres": doc["user_book"]["genres"]
-        })
+    # 🏷 Conditional GET: one indexed read of the version, no snapshot scan
+    version = await ensure_library_snapshot(lib)
+    headers = {
+        "ETag": _etag(lib["_id"], version, cursor, limit),
+        "Cache-Control": "public, no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    # 📄 Page through the materialized snapshot, keyed on the snapshot row's own
+    # _id so no private user_book_id ever reaches an anonymous reader
+    query: dict = {"library_id": lib["_id"]}
+    if cursor:
+        _, after = decode_cursor(cursor, "public", "asc")
+        query["_id"] = {"$gt": after}
+
+    docs = await public_library_items_collection.find(
+        query,
+        {"title": 1, "authors": 1, "cover_url": 1, "genres": 1}
+    ).sort("_id", 1).limit(limit + 1).to_list(length=None)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs.pop()
+        next_cursor = encode_cursor("public", "asc", None, docs[-1]["_id"])
+
+    for doc in docs:
+        del doc["_id"]
 
+    response.headers.update(headers)
     return {
         "library_name": lib["name"],
-        "books": results
+        "books": docs,
+        "next_cursor": next_cursor,
+        "limit": limit,
     }
@@ -1,13 +1,102 @@
+import asyncio
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT
 
-def _prehash(password: str) -> str:
+# bcrypt_sha256 for new hashes; plain "bcrypt" entries are the legacy
+# format (bcrypt over the raw sha256 digest) and are upgraded on login.
+# Pinning min/max rounds makes any hash at another cost "need update".
+pwd_context = CryptContext(
+    schemes=["bcrypt_sha256", "bcrypt"],
+    deprecated="auto",
+    bcrypt_sha256__default_rounds=BCRYPT_ROUNDS,
+    bcrypt_sha256__min_rounds=BCRYPT_ROUNDS,
+    bcrypt_sha256__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class HashingPoolBusy(Exception):
+    pass
+
+
+def _prehash(password: str) -> bytes:
     return hashlib.sha256(password.encode("utf-8")).digest()
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(_prehash(password))
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password_sync(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Returns (valid, new_hash); new_hash is set when the stored hash should be replaced."""
+    if pwd_context.identify(hashed) == "bcrypt":
+        try:
+            valid = pwd_context.verify(_prehash(password), hashed)
+        except ValueError:
+            # Digests containing NUL never made it into a legacy hash
+            return False, None
+        return valid, pwd_context.hash(password) if valid else None
+    return pwd_context.verify_and_update(password, hashed)
+
+
+class HashingPool:
+    """
+    bcrypt releases the GIL, so a thread pool keeps it off the event loop.
+    Work beyond `workers + queue_limit` outstanding calls is refused at once
+    instead of queueing behind seconds of hashing.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._outstanding = 0
+
+        self.completed = 0
+        self.rejected = 0
+
+    def _release(self, _future):
+        # Runs when the executor work itself ends (or is cancelled while still
+        # queued), not when the awaiting request gives up on it
+        with self._lock:
+            self._outstanding -= 1
+            self.completed += 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._outstanding >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HashingPoolBusy()
+            self._outstanding += 1
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "outstanding": self._outstanding,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+hashing_pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
+
+async def hash_password(password: str) -> str:
+    return await hashing_pool.run(hash_password_sync, password)
 
-def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(_prehash(password), hashed)
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await hashing_pool.run(verify_password_sync, password, hashed)
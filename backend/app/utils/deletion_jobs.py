@@ -0,0 +1,240 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.core.config import (
+    DELETE_CHUNK_SIZE,
+    DELETE_CHUNK_PAUSE_MS,
+    DELETE_JOB_STALE_SECONDS,
+    DELETE_JOB_MAX_ATTEMPTS,
+)
+from app.db.mongodb import (
+    deletion_jobs_collection,
+    libraries_collection,
+    library_books_collection,
+    user_books_collection,
+    public_library_items_collection,
+)
+from app.utils.trigram_index import trigram_indexes
+from app.utils.public_snapshots import remove_user_books, drop_library_snapshot
+from app.utils.versions import bump_user_version, bump_library_versions
+
+logger = logging.getLogger(__name__)
+
+## ---------------------------------------------------------------------------- ##
+## BACKGROUND DELETION JOBS                                                     ##
+##                                                                              ##
+## The target is tombstoned first (`deleting: True`), which hides it from every ##
+## read path at once, then removed in DELETE_CHUNK_SIZE slices over an indexed  ##
+## ObjectId range with a pause between slices, so one big delete never holds    ##
+## many pool connections or a request open. Progress lives in deletion_jobs;    ##
+## every step is idempotent, so a job whose worker or task died (no heartbeat  ##
+## for DELETE_JOB_STALE_SECONDS) is re-run from scratch by the periodic sweep;  ##
+## failed jobs are retried up to DELETE_JOB_MAX_ATTEMPTS times.                 ##
+## ---------------------------------------------------------------------------- ##
+
+_running: set = set()  # keeps job tasks referenced until they finish
+
+
+async def create_job(kind: str, user_id: str, target, total: int) -> ObjectId:
+    now = datetime.now(timezone.utc)
+    res = await deletion_jobs_collection.insert_one({
+        "kind": kind,
+        "user_id": user_id,
+        "target": target,
+        "status": "queued",
+        "total": total,
+        "deleted": 0,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+        "heartbeat": now,
+    })
+    return res.inserted_id
+
+
+def start_job(job_id: ObjectId):
+    task = asyncio.create_task(run_job(job_id))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+
+async def _progress(job_id, deleted: int, **fields):
+    now = datetime.now(timezone.utc)
+    await deletion_jobs_collection.update_one(
+        {"_id": job_id},
+        {"$inc": {"deleted": deleted}, "$set": {"updated_at": now, "heartbeat": now, **fields}}
+    )
+
+
+async def _pause():
+    await asyncio.sleep(DELETE_CHUNK_PAUSE_MS / 1000)
+
+
+async def run_job(job_id: ObjectId):
+    job = await deletion_jobs_collection.find_one_and_update(
+        {"_id": job_id},
+        {
+            "$set": {"status": "running", "deleted": 0, "heartbeat": datetime.now(timezone.utc)},
+            "$inc": {"attempts": 1},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+    try:
+        if job["kind"] == "library":
+            await _delete_library(job)
+        else:
+            await _delete_user_books(job)
+        await _progress(job_id, 0, status="done")
+    except Exception as e:
+        logger.exception("Deletion job %s failed", job_id)
+        await _progress(job_id, 0, status="failed", error=str(e))
+
+
+# -------------------- library --------------------
+async def tombstone_library(lib: dict):
+    await libraries_collection.update_one(
+        {"_id": lib["_id"]},
+        {"$set": {"deleting": True, "is_public": False}}
+    )
+
+
+async def _delete_library(job: dict):
+    library_id = job["target"]
+
+    # Workers holding a cached copy of the library may still add rows after the
+    # tombstone; keep sweeping until a full pass finds nothing.
+    while await _library_pass(job, library_id):
+        pass
+
+    # Snapshot rows without a library_books row (should be none, but never leave them)
+    await public_library_items_collection.delete_many({"library_id": library_id})
+    await libraries_collection.delete_one({"_id": library_id, "deleting": True})
+    await bump_user_version(job["user_id"])
+
+
+async def _library_pass(job: dict, library_id: ObjectId) -> int:
+    after: Optional[ObjectId] = None
+    removed = 0
+
+    while True:
+        # Covered by lb_library_userbook_unique_idx
+        query: dict = {"library_id": library_id}
+        if after is not None:
+            query["user_book_id"] = {"$gt": after}
+        rows = await library_books_collection.find(
+            query, {"_id": 0, "user_book_id": 1}
+        ).sort("user_book_id", 1).limit(DELETE_CHUNK_SIZE).to_list(length=None)
+        if not rows:
+            return removed
+
+        ub_ids = [r["user_book_id"] for r in rows]
+        id_range = {"$gte": ub_ids[0], "$lte": ub_ids[-1]}
+        await user_books_collection.update_many(
+            {"_id": {"$in": ub_ids}},
+            {"$pull": {"library_ids": library_id}}
+        )
+        await public_library_items_collection.delete_many({"library_id": library_id, "user_book_id": id_range})
+        res = await library_books_collection.delete_many({"library_id": library_id, "user_book_id": id_range})
+
+        removed += res.deleted_count
+        after = ub_ids[-1]
+        await _progress(job["_id"], res.deleted_count)
+        await _pause()
+
+
+async def delete_library_now(lib: dict):
+    """Synchronous path for small libraries; same steps, no chunking."""
+    await library_books_collection.delete_many({"library_id": lib["_id"]})
+    await user_books_collection.update_many(
+        {"user_id": lib["user_id"], "library_ids": lib["_id"]},
+        {"$pull": {"library_ids": lib["_id"]}}
+    )
+    await drop_library_snapshot(lib["_id"])
+    await libraries_collection.delete_one({"_id": lib["_id"]})
+
+
+# -------------------- user_books --------------------
+async def tombstone_user_books(user_id: str, ids: list):
+    await user_books_collection.update_many(
+        {"_id": {"$in": ids}, "user_id": user_id},
+        {"$set": {"deleting": True}}
+    )
+    # Public snapshots don't read the flag: take the rows out now (bumps the
+    # snapshot versions). Re-adding a book re-creates its rows.
+    await remove_user_books(user_id, ids)
+
+
+async def _delete_user_books(job: dict):
+    user_id = job["user_id"]
+    ids = sorted(job["target"])
+    touched_libraries = set()
+    user_library_ids = await libraries_collection.distinct("_id", {"user_id": user_id})
+
+    for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+        chunk = ids[start:start + DELETE_CHUNK_SIZE]
+        # Re-adding a book clears its tombstone; such documents are left alone
+        doomed = []
+        async for doc in user_books_collection.find(
+            {"_id": {"$in": chunk}, "user_id": user_id, "deleting": True},
+            {"_id": 1, "library_ids": 1}
+        ):
+            doomed.append(doc["_id"])
+            touched_libraries.update(doc.get("library_ids", []))
+        if doomed:
+            await remove_user_books(user_id, doomed)
+            await library_books_collection.delete_many(
+                {"user_book_id": {"$in": doomed}, "library_id": {"$in": user_library_ids}}
+            )
+            await user_books_collection.delete_many({"_id": {"$in": doomed}, "deleting": True})
+            trigram_indexes.delete(user_id, doomed)
+
+        await _progress(job["_id"], len(doomed))
+        await _pause()
+
+    await bump_library_versions(touched_libraries)
+    await bump_user_version(user_id)
+
+
+# -------------------- status / recovery --------------------
+async def get_job(job_id: str, user_id: str) -> Optional[dict]:
+    if not ObjectId.is_valid(job_id):
+        return None
+    return await deletion_jobs_collection.find_one(
+        {"_id": ObjectId(job_id), "user_id": user_id},
+        {"target": 0}
+    )
+
+
+async def resume_stale_jobs():
+    """Pick up jobs whose task stopped heart-beating (restart, crash, cancelled task) or that failed."""
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=DELETE_JOB_STALE_SECONDS)
+    while True:
+        job = await deletion_jobs_collection.find_one_and_update(
+            {
+                "heartbeat": {"$lt": stale_before},
+                "$or": [
+                    {"status": {"$in": ["queued", "running"]}},
+                    {"status": "failed", "attempts": {"$lt": DELETE_JOB_MAX_ATTEMPTS}},
+                ],
+            },
+            # Claims the job: other workers' sweeps now see a fresh heartbeat
+            {"$set": {"heartbeat": datetime.now(timezone.utc)}},
+        )
+        if not job:
+            return
+        logger.warning("Resuming deletion job %s (%s)", job["_id"], job["status"])
+        start_job(job["_id"])
+
+
+async def sweep_stale_jobs():
+    """Runs for the life of the process; started from the app lifespan."""
+    while True:
+        try:
+            await resume_stale_jobs()
+        except Exception:
+            logger.exception("Deletion job sweep failed")
+        await asyncio.sleep(DELETE_JOB_STALE_SECONDS / 2)
@@ -0,0 +1,72 @@
+from typing import Iterable
+from pymongo import UpdateOne, UpdateMany
+
+from app.db.mongodb import books_collection, user_books_collection
+from app.utils.search import build_search_blob, build_search_terms
+from app.utils.trigram_index import trigram_indexes
+from app.utils.public_snapshots import refresh_user_books
+from app.utils.versions import bump_library_versions, bump_user_versions
+
+
+def book_display_fields(book: dict) -> dict:
+    """Listing fields copied from `books` onto every user_books document."""
+    title = book.get("title") or ""
+    return {
+        "book_title": book.get("title"),
+        "book_authors": book.get("authors", []),
+        "book_cover_url": book.get("cover_url"),
+        "book_title_sort": title.casefold(),
+    }
+
+
+async def propagate_book_changes(book_ids: Iterable, batch_size: int = 1000):
+    """
+    Re-copy display fields and rebuild search_blob on every user_books
+    document that references one of `book_ids`. Call after editing `books`.
+    """
+    books = {
+        b["_id"]: b
+        async for b in books_collection.find({"_id": {"$in": list(book_ids)}})
+    }
+    if not books:
+        return
+
+    # Display fields are identical for every owner of a book
+    await user_books_collection.bulk_write(
+        [
+            UpdateMany({"book_id": book_id}, {"$set": book_display_fields(book)})
+            for book_id, book in books.items()
+        ],
+        ordered=False
+    )
+
+    # search_blob mixes in per-user data, so it is rebuilt per document
+    ops = []
+    cursor = user_books_collection.find(
+        {"book_id": {"$in": list(books)}},
+        {"user_id": 1, "book_id": 1, "genres": 1, "tags": 1, "personal_notes": 1}
+    )
+    async for user_book in cursor:
+        search_blob = build_search_blob(books[user_book["book_id"]], user_book)
+        ops.append(UpdateOne(
+            {"_id": user_book["_id"]},
+            {"$set": {
+                "search_blob": search_blob,
+                "search_terms": build_search_terms(search_blob)
+            }}
+        ))
+        trigram_indexes.upsert(user_book["user_id"], user_book["_id"], search_blob)
+
+        if len(ops) >= batch_size:
+            await user_books_collection.bulk_write(ops, ordered=False)
+            ops = []
+
+    if ops:
+        await user_books_collection.bulk_write(ops, ordered=False)
+
+    await refresh_user_books({"book_id": {"$in": list(books)}})
+
+    # Every owner's listings changed
+    owners = {"book_id": {"$in": list(books)}}
+    await bump_library_versions(await user_books_collection.distinct("library_ids", owners))
+    await bump_user_versions(await user_books_collection.distinct("user_id", owners))
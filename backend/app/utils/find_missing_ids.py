@@ -1,36 +1,43 @@
-from fastapi import HTTPException
 from bson import ObjectId
+from pymongo import ASCENDING
 from typing import List
 from .to_object_id import to_object_ids
 
+# Both fields are in this index, so the probe below never fetches a document.
+# Hinted by key pattern (lb_library_userbook_unique_idx in app/db/indexes.py),
+# so a rename of the index does not break every membership check.
+MEMBERSHIP_INDEX = [("library_id", ASCENDING), ("user_book_id", ASCENDING)]
+
+
+async def find_existing_ids(input_ids: List[ObjectId], library_id: ObjectId, collection) -> set:
+    """The subset of input_ids already in the library: one covered $in probe per call."""
+    if not input_ids:
+        return set()
+    cursor = collection.find(
+        {"library_id": library_id, "user_book_id": {"$in": input_ids}},
+        {"_id": 0, "user_book_id": 1}
+    ).hint(MEMBERSHIP_INDEX)
+    return {doc["user_book_id"] async for doc in cursor}
+
 
 async def find_missing_ids(ids: List[str], doc_id: str,  collection) -> list[str]:
-    input_ids = to_object_ids(ids)
+    # dict.fromkeys: drop duplicates, keep request order
+    input_ids = list(dict.fromkeys(to_object_ids(ids)))
     library_id = ObjectId(doc_id)
 
-    pipeline = [
-        {"$match": {"library_id": library_id}},
-        {
-            "$group": {
-                "_id": None,
-                "existingIds": {"$addToSet": "$user_book_id"}
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "missingIds": {
-                    "$setDifference": [input_ids, "$existingIds"]
-                }
-            }
-        }
-    ]
-
-    cursor = collection.aggregate(pipeline)
-    result = await cursor.to_list(length=1)
-
-    # If no documents exist for this library, all IDs are missing
-    if not result:
-        return [str(i) for i in input_ids]
-
-    return [str(i) for i in result[0]["missingIds"]]
+    existing = await find_existing_ids(input_ids, library_id, collection)
+    return [str(i) for i in input_ids if i not in existing]
+
+
+async def membership_matrix(library_ids: List[ObjectId], user_book_ids: List[ObjectId], collection) -> dict:
+    """user_book_id -> [library_id, ...] for the given libraries; same covered probe, both sides $in."""
+    matrix: dict = {ub_id: [] for ub_id in user_book_ids}
+    if not library_ids or not user_book_ids:
+        return matrix
+    cursor = collection.find(
+        {"library_id": {"$in": library_ids}, "user_book_id": {"$in": user_book_ids}},
+        {"_id": 0, "library_id": 1, "user_book_id": 1}
+    ).hint(MEMBERSHIP_INDEX)
+    async for doc in cursor:
+        matrix[doc["user_book_id"]].append(doc["library_id"])
+    return matrix
@@ -0,0 +1,27 @@
+import httpx
+from typing import Optional
+
+from app.core.config import ISBN_HTTP_TIMEOUT, ISBN_HTTP_MAX_CONNECTIONS
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # One pooled client per process so keep-alive connections are reused
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=ISBN_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=ISBN_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=ISBN_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
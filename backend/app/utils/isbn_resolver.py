@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import ISBN_NEGATIVE_TTL_SECONDS, ISBN_NEGATIVE_CACHE_SIZE
+from app.db.mongodb import books_collection
+from app.providers import metadata_lookup, build_book_doc, ProviderResponseError
+
+
+async def save_book(book_doc: dict) -> dict:
+    """
+    Upsert on isbn_13 so concurrent misses for the same ISBN cannot trip
+    books_isbn13_idx. Returns the stored document (ours or the winner's).
+    """
+    try:
+        return await books_collection.find_one_and_update(
+            {"isbn_13": book_doc["isbn_13"]},
+            {"$setOnInsert": book_doc},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Two upserts raced on the unique index; the other one won
+        book = await books_collection.find_one({"isbn_13": book_doc["isbn_13"]})
+        if not book:
+            raise
+        return book
+
+
+class IsbnResolver:
+    def __init__(self, negative_ttl: float, negative_max_size: int):
+        self.negative_ttl = negative_ttl
+        self.negative_max_size = negative_max_size
+        self._negative: OrderedDict = OrderedDict()  # isbn_13 -> expires_at
+        self._inflight: dict = {}  # isbn_13 -> asyncio.Task
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.negative_hits = 0
+
+    # -------------------- negative cache --------------------
+    def is_known_missing(self, isbn_13: str) -> bool:
+        expires_at = self._negative.get(isbn_13)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del self._negative[isbn_13]
+            return False
+        return True
+
+    def remember_missing(self, isbn_13: str):
+        self._negative[isbn_13] = time.monotonic() + self.negative_ttl
+        self._negative.move_to_end(isbn_13)
+        while len(self._negative) > self.negative_max_size:
+            self._negative.popitem(last=False)
+
+    # -------------------- resolution --------------------
+    async def resolve(self, isbn: str, isbn_13: str) -> Optional[dict]:
+        """
+        Returns the stored book for the ISBN, or None if the provider
+        does not know it. Provider/transport errors are re-raised.
+        """
+        if self.is_known_missing(isbn_13):
+            self.negative_hits += 1
+            return None
+
+        book = await books_collection.find_one({"isbn_13": isbn_13})
+        if book:
+            self.hits += 1
+            return book
+
+        return await self.fetch(isbn, isbn_13)
+
+    async def fetch(self, isbn: str, isbn_13: str) -> Optional[dict]:
+        """
+        Provider fetch + store for an ISBN the caller already knows is not in
+        the books collection. Concurrent calls for one ISBN share a single fetch.
+        """
+        task = self._inflight.get(isbn_13)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch_and_store(isbn, isbn_13))
+            self._inflight[isbn_13] = task
+            task.add_done_callback(lambda _: self._inflight.pop(isbn_13, None))
+
+        # Shield so one cancelled caller does not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, isbn: str, isbn_13: str) -> Optional[dict]:
+        try:
+            info = await metadata_lookup.lookup(isbn_13)
+        except ProviderResponseError:
+            self.remember_missing(isbn_13)
+            raise
+
+        if info is None:
+            self.remember_missing(isbn_13)
+            return None
+
+        return await save_book(build_book_doc(isbn, isbn_13, info))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced + self.negative_hits
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "negative_hits": self.negative_hits,
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+            "inflight": len(self._inflight),
+            "negative_cache_size": len(self._negative),
+            "providers": {p.name: p.stats() for p in metadata_lookup.providers},
+        }
+
+
+isbn_resolver = IsbnResolver(ISBN_NEGATIVE_TTL_SECONDS, ISBN_NEGATIVE_CACHE_SIZE)
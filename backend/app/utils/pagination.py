@@ -0,0 +1,132 @@
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.core.config import SECRET_KEY
+
+# Opaque keyset cursors: base64(json) + "." + HMAC, binding the sort
+# field and order so a token can only continue the listing it came from.
+
+# ?sort= value -> user_books field it orders by
+USER_BOOK_SORT_FIELDS = {
+    "updated_at": "updated_at",
+    "rating": "rating",
+    "title": "book_title_sort",
+    "relevance": "_score",
+}
+
+
+def _sign(payload: bytes) -> str:
+    digest = hmac.new((SECRET_KEY or "").encode(), payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def encode_cursor(sort: str, order: str, value, oid) -> str:
+    if isinstance(value, datetime):
+        value_type, value = "dt", value.isoformat()
+    else:
+        value_type = "raw"
+
+    payload = json.dumps(
+        {"s": sort, "o": order, "t": value_type, "v": value, "id": str(oid)},
+        separators=(",", ":")
+    ).encode()
+    body = base64.urlsafe_b64encode(payload).decode().rstrip("=")
+    return f"{body}.{_sign(payload)}"
+
+
+def decode_cursor(token: str, sort: str, order: str) -> tuple:
+    """Returns (sort_value, _id) or raises 400 for a forged/foreign token."""
+    try:
+        body, signature = token.split(".", 1)
+        payload = _b64decode(body)
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError("bad signature")
+
+        data = json.loads(payload)
+        if data["s"] != sort or data["o"] != order:
+            raise ValueError("cursor belongs to another ordering")
+
+        value = data["v"]
+        if data["t"] == "dt":
+            value = datetime.fromisoformat(value)
+        return value, ObjectId(data["id"])
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+
+def keyset_match(field: str, value, oid: ObjectId, direction: int) -> dict:
+    """
+    Everything strictly after (value, oid) in a {field: direction, _id: direction}
+    sort. MongoDB sorts null/missing below every other value, so nulls are
+    the tail of a descending listing and the head of an ascending one.
+    """
+    op = "$lt" if direction == -1 else "$gt"
+
+    if value is None:
+        branches = [{field: None, "_id": {op: oid}}]
+        if direction == 1:
+            branches.append({field: {"$ne": None}})
+    else:
+        branches = [
+            {field: {op: value}},
+            {field: value, "_id": {op: oid}},
+        ]
+        if direction == -1:
+            branches.append({field: None})
+
+    return {"$or": branches}
+
+
+def cursor_match(
+    cursor: Optional[str], sort: str, order: str, field: str, direction: int
+) -> Optional[dict]:
+    if not cursor:
+        return None
+    value, oid = decode_cursor(cursor, sort, order)
+    return keyset_match(field, value, oid, direction)
+
+
+def keyset_page_stages(
+    sort: str, order: str, cursor: Optional[str], limit: int
+) -> list:
+    """
+    Stages that order user_books by ?sort/?order and cut one page (+1 row to
+    detect a next page). Put them straight after the user_books $match so the
+    supporting (user_id, ..., field, _id) index serves both the range and the sort.
+    """
+    direction = -1 if order == "desc" or sort == "relevance" else 1
+    field = USER_BOOK_SORT_FIELDS[sort]
+    stages = []
+
+    if sort == "relevance":
+        # textScore only exists after $text, so it is added as a field
+        stages.append({"$addFields": {"_score": {"$meta": "textScore"}}})
+
+    after = cursor_match(cursor, sort, order, field, direction)
+    if after:
+        stages.append({"$match": after})
+
+    stages.extend([
+        {"$sort": {field: direction, "_id": direction}},
+        {"$limit": limit + 1},
+    ])
+    return stages
+
+
+def next_page_cursor(docs: list, limit: int, sort: str, order: str) -> Optional[str]:
+    """Drops the look-ahead row (in place) and returns the cursor for the next page."""
+    if len(docs) <= limit:
+        return None
+    docs.pop()
+    last = docs[-1]
+    return encode_cursor(sort, order, last.get(USER_BOOK_SORT_FIELDS[sort]), last["_id"])
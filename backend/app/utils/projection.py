@@ -0,0 +1,83 @@
+from typing import Optional, Tuple
+from fastapi import HTTPException
+
+from app.utils.pagination import USER_BOOK_SORT_FIELDS
+
+## ---------------------------------------------------------------------------- ##
+## FIELD SELECTION for the list endpoints                                       ##
+##                                                                              ##
+##   ?view=card                      -> rating + book title/authors/cover       ##
+##   ?fields=rating,book.title       -> exactly those (plus ids)                ##
+##   neither / view=full             -> the unprojected, historical shape       ##
+##                                                                              ##
+## A selection becomes an inclusion $project before the books $lookup and a     ##
+## $project inside it, so unselected fields never leave MongoDB.                ##
+## ---------------------------------------------------------------------------- ##
+
+VIEW_PATTERN = "^(card|full)$"
+
+USER_BOOK_FIELDS = {
+    "genres", "tags", "personal_notes", "rating", "read_status",
+    "created_at", "updated_at",
+}
+BOOK_FIELDS = {
+    "isbn_13", "isbn_10", "title", "authors", "publisher", "published_year",
+    "description", "categories", "cover_url", "created_at",
+}
+
+VIEWS = {
+    "card": "rating,book.title,book.authors,book.cover_url",
+    "full": None,
+}
+
+# (user_book fields, book fields); None means the full documents
+FieldSelection = Optional[Tuple[frozenset, frozenset]]
+
+
+def resolve_fields(view: Optional[str], fields: Optional[str]) -> FieldSelection:
+    spec = fields if fields else VIEWS.get(view or "full")
+    if not spec:
+        return None
+
+    user_fields, book_fields = set(), set()
+    for name in (f.strip() for f in spec.split(",")):
+        if not name:
+            continue
+        if name.startswith("book."):
+            if name[5:] not in BOOK_FIELDS:
+                raise HTTPException(400, f"Unknown field: {name}")
+            book_fields.add(name[5:])
+        elif name in USER_BOOK_FIELDS:
+            user_fields.add(name)
+        else:
+            raise HTTPException(400, f"Unknown field: {name}")
+
+    return frozenset(user_fields), frozenset(book_fields)
+
+
+def user_book_projection(selection: FieldSelection, sort: str) -> dict:
+    """Inclusion $project for user_books; keeps what the join and the cursor need."""
+    user_fields, _ = selection
+    return {
+        "book_id": 1,
+        USER_BOOK_SORT_FIELDS[sort]: 1,
+        **{f: 1 for f in user_fields},
+    }
+
+
+def book_lookup_stages(selection: FieldSelection) -> list:
+    lookup = {
+        "from": "books",
+        "localField": "book_id",
+        "foreignField": "_id",
+        "as": "book",
+    }
+    if selection is not None:
+        _, book_fields = selection
+        # localField + pipeline together need MongoDB 5.0+
+        lookup["pipeline"] = [{"$project": {f: 1 for f in book_fields} or {"_id": 1}}]
+
+    return [
+        {"$lookup": lookup},
+        {"$unwind": {"path": "$book", "preserveNullAndEmptyArrays": True}},
+    ]
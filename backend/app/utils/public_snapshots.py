@@ -0,0 +1,160 @@
+import asyncio
+from typing import Iterable, Optional
+from pymongo import UpdateOne, ReturnDocument
+
+from app.db.mongodb import (
+    libraries_collection,
+    user_books_collection,
+    public_library_items_collection,
+)
+
+# Public libraries are served from a materialized snapshot:
+#   public_library_items  one compact row per (library_id, user_book_id)
+#   libraries.snapshot_version  bumped on every change, used as the ETag
+# Every write that can change what a public library shows calls one of
+# the functions below; private libraries never get a snapshot.
+
+_SNAPSHOT_FIELDS = {"user_id": 1, "genres": 1, "book_title": 1, "book_authors": 1, "book_cover_url": 1}
+
+_building: dict = {}  # library_id -> asyncio.Task
+
+
+def snapshot_item(library_id, user_book: dict) -> dict:
+    # Same projection view_public_library has always returned
+    return {
+        "library_id": library_id,
+        "user_book_id": user_book["_id"],
+        # Owner, so removals can be scoped to the caller (never served publicly)
+        "user_id": user_book["user_id"],
+        "title": user_book.get("book_title"),
+        "authors": user_book.get("book_authors", []),
+        "cover_url": user_book.get("book_cover_url"),
+        "genres": user_book.get("genres", []),
+    }
+
+
+async def bump_versions(library_ids: Iterable):
+    library_ids = list(library_ids)
+    if library_ids:
+        await libraries_collection.update_many(
+            {"_id": {"$in": library_ids}},
+            {"$inc": {"snapshot_version": 1}}
+        )
+
+
+async def rebuild_library_snapshot(library: dict, batch_size: int = 1000) -> int:
+    """Full rebuild (library just became public, or its snapshot is missing)."""
+    library_id = library["_id"]
+    await public_library_items_collection.delete_many({"library_id": library_id})
+
+    ops = []
+    cursor = user_books_collection.find(
+        {"user_id": library["user_id"], "library_ids": library_id},
+        _SNAPSHOT_FIELDS
+    )
+    async for user_book in cursor:
+        ops.append(_upsert_op(library_id, user_book))
+        if len(ops) >= batch_size:
+            await public_library_items_collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await public_library_items_collection.bulk_write(ops, ordered=False)
+
+    updated = await libraries_collection.find_one_and_update(
+        {"_id": library_id},
+        {"$inc": {"snapshot_version": 1}},
+        projection={"snapshot_version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    return updated["snapshot_version"] if updated else 0
+
+
+async def ensure_library_snapshot(library: dict) -> int:
+    """Builds a missing snapshot once, even under a burst of first requests."""
+    if library.get("snapshot_version"):
+        return library["snapshot_version"]
+
+    task = _building.get(library["_id"])
+    if task is None:
+        task = asyncio.ensure_future(rebuild_library_snapshot(library))
+        _building[library["_id"]] = task
+        task.add_done_callback(lambda _: _building.pop(library["_id"], None))
+    return await asyncio.shield(task)
+
+
+async def drop_library_snapshot(library_id):
+    await public_library_items_collection.delete_many({"library_id": library_id})
+    await libraries_collection.update_one(
+        {"_id": library_id},
+        {"$unset": {"snapshot_version": ""}}
+    )
+
+
+async def add_to_snapshot(library: dict, user_book_ids: list):
+    # Visibility is checked against the database in _upsert_items, never the
+    # (possibly cached) library doc
+    await _upsert_items(
+        [library["_id"]],
+        {"_id": {"$in": user_book_ids}, "user_id": library["user_id"]}
+    )
+
+
+async def remove_from_snapshot(library: dict, user_book_ids: list):
+    # Unconditional: a private library simply has no rows to match
+    res = await public_library_items_collection.delete_many({
+        "library_id": library["_id"],
+        "user_book_id": {"$in": user_book_ids}
+    })
+    if res.deleted_count:
+        await bump_versions([library["_id"]])
+
+
+async def refresh_user_books(user_book_filter: dict):
+    """Re-copy user_books that changed into every public snapshot holding them."""
+    await _upsert_items(None, user_book_filter)
+
+
+async def remove_user_books(user_id: str, user_book_ids: list):
+    owned = {"user_id": user_id, "user_book_id": {"$in": user_book_ids}}
+    library_ids = await public_library_items_collection.distinct("library_id", owned)
+    if not library_ids:
+        return
+    await public_library_items_collection.delete_many(owned)
+    await bump_versions(library_ids)
+
+
+async def _upsert_items(library_ids: Optional[list], user_book_filter: dict):
+    user_books = await user_books_collection.find(
+        {**user_book_filter, "library_ids.0": {"$exists": True}},
+        {**_SNAPSHOT_FIELDS, "library_ids": 1}
+    ).to_list(length=None)
+    if not user_books:
+        return
+
+    candidates = set(library_ids) if library_ids else {
+        lib_id for ub in user_books for lib_id in ub["library_ids"]
+    }
+    public_ids = set(await libraries_collection.distinct(
+        "_id", {"_id": {"$in": list(candidates)}, "is_public": True}
+    ))
+    if not public_ids:
+        return
+
+    ops, touched = [], set()
+    for ub in user_books:
+        for lib_id in ub["library_ids"]:
+            if lib_id in public_ids:
+                ops.append(_upsert_op(lib_id, ub))
+                touched.add(lib_id)
+
+    if ops:
+        await public_library_items_collection.bulk_write(ops, ordered=False)
+        await bump_versions(touched)
+
+
+def _upsert_op(library_id, user_book: dict) -> UpdateOne:
+    return UpdateOne(
+        {"library_id": library_id, "user_book_id": user_book["_id"]},
+        {"$set": snapshot_item(library_id, user_book)},
+        upsert=True
+    )
@@ -1,9 +1,88 @@
+import re
+from typing import Optional
+from fastapi import HTTPException
+
+SEARCH_MODE_PATTERN = "^(text|prefix|phrase|substring|contains)$"
+
+# $text drops very short terms, so tiny queries fall back to the substring scan
+MIN_TEXT_QUERY_LENGTH = 3
+
+_WORD_RE = re.compile(r"\w+")
+
+
 def build_search_blob(book: dict, user_data: dict) -> str:
+    # `or` guards: optional fields are stored as explicit nulls
     return " ".join([
-        book.get("title", ""),
-        " ".join(book.get("authors", [])),
-        " ".join(book.get("categories", [])),
-        " ".join(user_data.get("genres", [])),
-        " ".join(user_data.get("tags", [])),
-        user_data.get("personal_notes", "")
+        book.get("title") or "",
+        " ".join(book.get("authors") or []),
+        " ".join(book.get("categories") or []),
+        " ".join(user_data.get("genres") or []),
+        " ".join(user_data.get("tags") or []),
+        user_data.get("personal_notes") or ""
     ]).lower()
+
+
+def build_search_terms(search_blob: str) -> list[str]:
+    # Distinct words of the blob; indexed with user_id for anchored prefix search
+    return sorted(set(_WORD_RE.findall(search_blob.lower())))
+
+
+def resolve_search_mode(q: str, mode: str) -> str:
+    if mode == "text" and len(q.strip()) < MIN_TEXT_QUERY_LENGTH:
+        return "substring"
+    return mode
+
+
+def build_search_match(q: str, mode: str, field_prefix: str = "") -> dict:
+    """
+    Match fragment for `q` in the given (already resolved) mode.
+
+    text      $text on ub_user_searchblob_text_idx (word/stem match, scored)
+    phrase    $text with the whole query as one quoted phrase (scored)
+    prefix    every query word must prefix a word of the blob
+              (anchored regexes on search_terms, served by ub_user_searchterms_idx)
+    substring unanchored regex on search_blob (collection scan of the user's books)
+    contains  every query word appears anywhere in the blob; routes serve this
+              from the in-process trigram index (trigram_index.py), this is
+              the equivalent regex form
+
+    $text is only valid at the top level of the first $match stage, so
+    `field_prefix` is only applied to the prefix/substring modes.
+    """
+    q = q.strip().lower()
+
+    if mode == "text":
+        return {"$text": {"$search": q}}
+
+    if mode == "phrase":
+        return {"$text": {"$search": '"' + q.replace('"', " ") + '"'}}
+
+    if mode == "prefix":
+        words = _WORD_RE.findall(q)
+        if not words:
+            raise HTTPException(400, "Search query has no searchable words")
+        return {
+            f"{field_prefix}search_terms": {
+                "$all": [re.compile("^" + re.escape(w)) for w in words]
+            }
+        }
+
+    if mode == "contains":
+        return {
+            "$and": [
+                {f"{field_prefix}search_blob": {"$regex": re.escape(w)}}
+                for w in q.split()
+            ]
+        }
+
+    return {
+        f"{field_prefix}search_blob": {
+            "$regex": re.escape(q),
+            "$options": "i"
+        }
+    }
+
+
+def is_scored(mode: Optional[str]) -> bool:
+    return mode in ("text", "phrase")
+
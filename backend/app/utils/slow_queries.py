@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import json_util
+from pymongo import monitoring
+
+from app.utils.metrics import current_endpoint
+
+## ---------------------------------------------------------------------------- ##
+## SLOW-QUERY RECORDER (opt-in: SLOW_QUERY_RECORDER=true)                       ##
+##                                                                              ##
+## A CommandListener that watches find/aggregate commands. When one takes       ##
+## longer than SLOW_QUERY_THRESHOLD_MS it is re-run through                     ##
+## explain("executionStats") on the event loop and a summary is upserted into   ##
+## `slow_queries`, one document per query *shape* (literals redacted).          ##
+## A shape is explained at most once per SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS;   ##
+## repeats only bump its counters.                                              ##
+## ---------------------------------------------------------------------------- ##
+
+WATCHED_COMMANDS = {"aggregate", "find"}
+OWN_COLLECTION = "slow_queries"
+MAX_TRACKED_SHAPES = 10_000
+
+# Values under these keys describe the query's structure, not user data
+STRUCTURAL_KEYS = {
+    "aggregate", "find",  # collection name
+    "$sort", "$project", "$limit", "$skip", "$unwind", "$meta", "$count",
+    "sort", "projection", "limit", "skip", "batchSize", "cursor",
+    "from", "localField", "foreignField", "as", "path", "preserveNullAndEmptyArrays",
+}
+# Driver/session fields that explain rejects or that vary per call
+DRIVER_KEYS = {
+    "lsid", "$clusterTime", "$db", "txnNumber", "$readPreference", "readConcern",
+    "writeConcern", "apiVersion", "apiStrict", "apiDeprecationErrors", "startTransaction",
+    "autocommit",
+}
+
+
+def redact(value, key: Optional[str] = None):
+    if key in STRUCTURAL_KEYS:
+        return value
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        # $in lists etc. collapse to one placeholder so list length is not a new shape
+        items = [redact(v) for v in value]
+        if items and all(i == "?" for i in items):
+            return ["?"]
+        return items
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, str) and value.startswith("$"):
+        return value  # field path / variable
+    return "?"
+
+
+def shape_of(command: dict) -> dict:
+    return redact({k: v for k, v in command.items() if k not in DRIVER_KEYS})
+
+
+def fingerprint(collection: str, shape: dict) -> str:
+    raw = json.dumps([collection, shape], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+# -------------------- explain summaries --------------------
+def _plan_stages(plan: dict) -> list:
+    """Winning plan as a list of stage names, outermost first, e.g. ["FETCH", "IXSCAN ub_user_updated_idx"]."""
+    stages = []
+    node = plan.get("queryPlan", plan)  # SBE plans nest the classic tree under queryPlan
+    while node:
+        name = node.get("stage", "?")
+        if node.get("indexName"):
+            name = f"{name} {node['indexName']}"
+        stages.append(name)
+        children = node.get("inputStages") or ([node["inputStage"]] if node.get("inputStage") else [])
+        if len(children) > 1:
+            stages.append("[" + " | ".join(" <- ".join(_plan_stages(c)) for c in children) + "]")
+            break
+        node = children[0] if children else None
+    return stages
+
+
+def summarize_explain(explain: dict) -> dict:
+    cursor_stage = explain
+    pipeline_stages = []
+    if "stages" in explain:
+        # Parts of the pipeline could not be pushed into the query layer
+        cursor_stage = explain["stages"][0].get("$cursor", {})
+        pipeline_stages = [next(iter(s)) for s in explain["stages"][1:]]
+
+    planner = cursor_stage.get("queryPlanner", {})
+    stats = cursor_stage.get("executionStats", {})
+    plan = _plan_stages(planner.get("winningPlan", {}))
+
+    return {
+        "winning_plan": plan,
+        "pipeline_stages": pipeline_stages,
+        "collscan": any(s.startswith("COLLSCAN") for s in plan),
+        "blocking_sort": any(s.split(" ")[0] == "SORT" for s in plan) or "$sort" in pipeline_stages,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "explain_ms": stats.get("executionTimeMillis"),
+    }
+
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float, explain_interval: float):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self._lock = threading.Lock()
+        self._inflight: dict = {}      # (connection_id, request_id) -> (db, command, endpoint)
+        self._last_explained: dict = {}  # fingerprint -> monotonic time
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Explains run on the app's loop; nothing is recorded before this is called."""
+        self._loop = loop
+
+    # -------------------- listener --------------------
+    def started(self, event):
+        if self._loop is None or event.command_name not in WATCHED_COMMANDS:
+            return
+        if event.command.get(event.command_name) == OWN_COLLECTION:
+            return
+        with self._lock:
+            self._inflight[(event.connection_id, event.request_id)] = (
+                event.database_name, event.command, current_endpoint()
+            )
+
+    def succeeded(self, event):
+        with self._lock:
+            entry = self._inflight.pop((event.connection_id, event.request_id), None)
+        if entry is None or event.duration_micros < self.threshold_ms * 1000:
+            return
+        database, command, endpoint = entry
+        asyncio.run_coroutine_threadsafe(
+            self.record(database, command, endpoint, event.duration_micros / 1000),
+            self._loop,
+        )
+
+    def failed(self, event):
+        with self._lock:
+            self._inflight.pop((event.connection_id, event.request_id), None)
+
+    # -------------------- recording --------------------
+    async def record(self, database: str, command: dict, endpoint: str, duration_ms: float):
+        from app.db.mongodb import client  # imported late: mongodb registers this listener
+
+        name = next(iter(command))
+        collection = command[name]
+        shape = shape_of(command)
+        key = fingerprint(collection, shape)
+        now = datetime.now(timezone.utc)
+
+        update = {
+            "$setOnInsert": {
+                "collection": collection,
+                "command": name,
+                # Stored as extended JSON: redacted shapes may have $-prefixed keys
+                "shape": json_util.dumps(shape),
+                "first_seen": now,
+            },
+            "$set": {"last_seen": now, "last_ms": round(duration_ms, 1)},
+            "$addToSet": {"endpoints": endpoint},
+            "$inc": {"count": 1, "total_ms": duration_ms},
+            "$max": {"max_ms": round(duration_ms, 1)},
+        }
+
+        last = self._last_explained.get(key)
+        if last is None or time.monotonic() - last >= self.explain_interval:
+            if len(self._last_explained) >= MAX_TRACKED_SHAPES:
+                self._last_explained.clear()
+            self._last_explained[key] = time.monotonic()
+            explain_cmd = {k: v for k, v in command.items() if k not in DRIVER_KEYS}
+            try:
+                explain = await client[database].command(
+                    {"explain": explain_cmd, "verbosity": "executionStats"}
+                )
+                update["$set"]["explain"] = summarize_explain(explain)
+                update["$set"]["explained_at"] = now
+            except Exception as e:
+                update["$set"]["explain_error"] = str(e)
+
+        await client[database][OWN_COLLECTION].update_one({"_id": key}, update, upsert=True)
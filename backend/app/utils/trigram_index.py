@@ -0,0 +1,224 @@
+import asyncio
+import re
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from app.core.config import TRIGRAM_INDEX_MEMORY_MB, TRIGRAM_MAX_CANDIDATES
+from bson import ObjectId
+
+from app.db.mongodb import user_books_collection, users_collection
+from app.utils.search import build_search_match
+
+_WORD_RE = re.compile(r"\S+")
+
+# Rough CPython costs, only used to keep the registry inside its budget
+_DOC_OVERHEAD = 120       # dict slot + ObjectId + str header
+_POSTING_OVERHEAD = 70    # set slot + trigram set share
+
+
+def query_words(q: str) -> list[str]:
+    return _WORD_RE.findall(q.strip().lower())
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class UserTrigramIndex:
+    """Trigram -> user_book _ids for one user's search_blobs."""
+
+    def __init__(self):
+        self.blobs: dict = {}     # _id -> search_blob
+        self.postings: dict = {}  # trigram -> set(_id)
+        self.size_bytes = 0
+
+    def add(self, oid, blob: str):
+        self.remove(oid)
+        blob = blob.lower()
+        grams = trigrams(blob)
+        self.blobs[oid] = blob
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(oid)
+        self.size_bytes += _DOC_OVERHEAD + len(blob) + len(grams) * _POSTING_OVERHEAD
+
+    def remove(self, oid):
+        blob = self.blobs.pop(oid, None)
+        if blob is None:
+            return
+        grams = trigrams(blob)
+        for gram in grams:
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(oid)
+                if not ids:
+                    del self.postings[gram]
+        self.size_bytes -= _DOC_OVERHEAD + len(blob) + len(grams) * _POSTING_OVERHEAD
+
+    def search(self, q: str) -> list:
+        """_ids whose blob contains every word of `q` as a substring."""
+        words = query_words(q)
+        if not words:
+            return []
+
+        grams = set()
+        for word in words:
+            grams |= trigrams(word)
+
+        if grams:
+            postings = sorted((self.postings.get(g, set()) for g in grams), key=len)
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                if not candidates:
+                    break
+                candidates &= ids
+        else:
+            # Only 1-2 character words: nothing to intersect, verify everything
+            candidates = self.blobs.keys()
+
+        # Trigram hits are necessary, not sufficient: confirm the substrings
+        return [
+            oid for oid in candidates
+            if all(word in self.blobs[oid] for word in words)
+        ]
+
+
+class TrigramIndexRegistry:
+    """
+    Lazily built per-user indexes, evicted least-recently-used first once
+    their estimated size exceeds `memory_budget` bytes.
+
+    Each index is stamped with the users.data_version it reflects. Every
+    user_books write bumps that counter, so a write from another worker
+    process or a script shows up as a newer version and the next search
+    rebuilds the index. Writes made through this process are applied
+    incrementally and advance the stamp (note_version), so they do not.
+    """
+
+    def __init__(self, memory_budget: int):
+        self.memory_budget = memory_budget
+        self._indexes: OrderedDict = OrderedDict()  # user_id -> UserTrigramIndex
+        self._versions: dict = {}                   # user_id -> users.data_version it reflects
+        self._building: dict = {}                   # user_id -> asyncio.Task
+        self._pending: dict = {}                    # user_id -> [(op, args)] seen while building
+
+        self.builds = 0
+        self.stale_rebuilds = 0
+        self.evictions = 0
+
+    def size_bytes(self) -> int:
+        return sum(index.size_bytes for index in self._indexes.values())
+
+    async def get(self, user_id: str, version: int) -> UserTrigramIndex:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            if self._versions.get(user_id) == version:
+                self._indexes.move_to_end(user_id)
+                return index
+            # Written elsewhere since the build: drop it, searches rebuild below
+            self._forget(user_id)
+            self.stale_rebuilds += 1
+
+        task = self._building.get(user_id)
+        if task is None:
+            self._pending[user_id] = []
+            task = asyncio.ensure_future(self._build(user_id, version))
+            self._building[user_id] = task
+        return await asyncio.shield(task)
+
+    async def _build(self, user_id: str, version: int) -> UserTrigramIndex:
+        # `version` was read before the scan, so writes racing it leave the
+        # stamp behind and cost one more rebuild rather than a stale index
+        index = UserTrigramIndex()
+        try:
+            cursor = user_books_collection.find(
+                {"user_id": user_id},
+                {"search_blob": 1}
+            )
+            async for doc in cursor:
+                index.add(doc["_id"], doc.get("search_blob", ""))
+
+            # Writes that landed while we were reading
+            for op, args in self._pending.get(user_id, []):
+                getattr(index, op)(*args)
+        finally:
+            self._building.pop(user_id, None)
+            self._pending.pop(user_id, None)
+
+        self.builds += 1
+        self._indexes[user_id] = index
+        self._versions[user_id] = version
+        self._evict(keep=user_id)
+        return index
+
+    def _forget(self, user_id: str):
+        self._indexes.pop(user_id, None)
+        self._versions.pop(user_id, None)
+
+    def _evict(self, keep: str):
+        total = self.size_bytes()
+        while total > self.memory_budget and len(self._indexes) > 1:
+            user_id, index = next(iter(self._indexes.items()))
+            if user_id == keep:
+                self._indexes.move_to_end(user_id)
+                continue
+            self._forget(user_id)
+            total -= index.size_bytes
+            self.evictions += 1
+
+    def is_loaded(self, user_id: str) -> bool:
+        return user_id in self._indexes or user_id in self._building
+
+    # -------------------- incremental maintenance --------------------
+    def _apply(self, user_id: str, op: str, *args):
+        if user_id in self._building:
+            self._pending[user_id].append((op, args))
+        index = self._indexes.get(user_id)
+        if index is not None:
+            getattr(index, op)(*args)
+
+    def upsert(self, user_id: str, oid, search_blob: str):
+        self._apply(user_id, "add", oid, search_blob)
+
+    def delete(self, user_id: str, oids: Iterable):
+        for oid in oids:
+            self._apply(user_id, "remove", oid)
+
+    def note_version(self, user_id: str, version: int):
+        """
+        This process bumped the user's counter to `version` after applying its
+        own writes here. Only a direct successor of the stamp is ours alone;
+        any gap means another writer got in between and the index stays stale.
+        """
+        if self._versions.get(user_id) == version - 1:
+            self._versions[user_id] = version
+
+    # -------------------- query --------------------
+    async def search_match(self, user_id: str, q: str, version: Optional[int] = None) -> dict:
+        """
+        Match fragment restricting user_books to the ones containing every
+        word of `q`. Very broad queries fall back to per-word regexes so the
+        $in list stays bounded. Pass the users.data_version when the caller
+        already read it (ETag), otherwise it is read here.
+        """
+        if version is None:
+            user = await users_collection.find_one({"_id": ObjectId(user_id)}, {"data_version": 1})
+            version = (user or {}).get("data_version", 0)
+        index = await self.get(user_id, version)
+        ids = index.search(q)
+        if len(ids) <= TRIGRAM_MAX_CANDIDATES:
+            return {"_id": {"$in": ids}}
+
+        return build_search_match(q, "contains")
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._indexes),
+            "size_bytes": self.size_bytes(),
+            "memory_budget": self.memory_budget,
+            "builds": self.builds,
+            "stale_rebuilds": self.stale_rebuilds,
+            "evictions": self.evictions,
+        }
+
+
+trigram_indexes = TrigramIndexRegistry(int(TRIGRAM_INDEX_MEMORY_MB * 1024 * 1024))
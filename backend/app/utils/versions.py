@@ -0,0 +1,81 @@
+import hashlib
+from typing import Iterable, Optional
+from bson import ObjectId
+from fastapi import Request
+from pymongo import ReturnDocument
+
+from app.db.mongodb import users_collection, libraries_collection, user_books_collection
+from app.utils.trigram_index import trigram_indexes
+
+# Change counters behind the ETags of the authenticated list endpoints:
+#   users.data_version      any write by the user (books, libraries, membership)
+#   libraries.data_version  any write that changes what the library view shows
+
+
+async def bump_user_version(user_id: str) -> int:
+    user = await users_collection.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        {"$inc": {"data_version": 1}},
+        projection={"data_version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    version = (user or {}).get("data_version", 0)
+    # Our own writes are already in this process's trigram index
+    trigram_indexes.note_version(user_id, version)
+    return version
+
+
+async def bump_user_versions(user_ids: Iterable):
+    user_ids = [ObjectId(u) for u in user_ids]
+    if user_ids:
+        await users_collection.update_many(
+            {"_id": {"$in": user_ids}},
+            {"$inc": {"data_version": 1}}
+        )
+
+
+async def bump_library_versions(library_ids: Iterable):
+    library_ids = list(library_ids)
+    if library_ids:
+        await libraries_collection.update_many(
+            {"_id": {"$in": library_ids}},
+            {"$inc": {"data_version": 1}}
+        )
+
+
+async def touch_user_books(user_id: str, user_book_filter: dict):
+    """Bump the user and every library holding a user_book matched by the filter."""
+    library_ids = await user_books_collection.distinct(
+        "library_ids", {**user_book_filter, "user_id": user_id}
+    )
+    await bump_library_versions(library_ids)
+    await bump_user_version(user_id)
+
+
+async def get_user_version(user_id: str) -> int:
+    user = await users_collection.find_one(
+        {"_id": ObjectId(user_id)},
+        {"data_version": 1}
+    )
+    return (user or {}).get("data_version", 0)
+
+
+async def get_library_header(library_id) -> Optional[dict]:
+    """What the library view shows about the library, plus its counter; always read fresh."""
+    return await libraries_collection.find_one(
+        {"_id": ObjectId(library_id), "deleting": {"$ne": True}},
+        {"data_version": 1, "name": 1, "is_public": 1, "is_default": 1}
+    )
+
+
+def make_etag(scope: str, version: int, request: Request) -> str:
+    # The same version serves many different pages/filters, so the query is part of the tag
+    query = hashlib.sha1(str(request.url.query).encode()).hexdigest()[:10]
+    return f'"{scope}-{version}-{query}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
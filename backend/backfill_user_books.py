@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import time
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.db.mongodb import books_collection, user_books_collection, library_books_collection
+from app.utils.search import build_search_blob, build_search_terms
+from app.utils.denormalize import book_display_fields
+from app.utils.versions import bump_user_versions
+
+## ---------------------------------------------------------------------------- ##
+## RECOMPUTE DERIVED FIELDS ON EXISTING user_books DOCUMENTS                    ##
+##                                                                              ##
+## Walks user_books in _id order in batches, so it can be stopped and resumed   ##
+## with --after <last printed _id>. Safe to run more than once.                 ##
+## Bumps users.data_version per batch so ETags and the trigram indexes of       ##
+## running workers pick up the new search_blobs.                                ##
+## ---------------------------------------------------------------------------- ##
+
+
+def derived_fields(user_book: dict, book: dict, library_ids: list) -> dict:
+    search_blob = build_search_blob(book, user_book)
+    return {
+        **book_display_fields(book),
+        "library_ids": library_ids,
+        "search_blob": search_blob,
+        "search_terms": build_search_terms(search_blob),
+    }
+
+
+async def backfill(batch_size: int, after=None):
+    query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+    started = time.monotonic()
+    total = 0
+
+    while True:
+        batch = await user_books_collection.find(query).sort("_id", 1).limit(batch_size).to_list(length=None)
+        if not batch:
+            break
+
+        book_ids = list({ub["book_id"] for ub in batch})
+        books = {
+            b["_id"]: b
+            async for b in books_collection.find({"_id": {"$in": book_ids}})
+        }
+
+        # Library membership, mirrored from library_books
+        memberships = {}
+        async for row in library_books_collection.aggregate([
+            {"$match": {"user_book_id": {"$in": [ub["_id"] for ub in batch]}}},
+            {"$group": {"_id": "$user_book_id", "library_ids": {"$addToSet": "$library_id"}}},
+        ]):
+            memberships[row["_id"]] = row["library_ids"]
+
+        ops = [
+            UpdateOne(
+                {"_id": ub["_id"]},
+                {"$set": derived_fields(ub, books[ub["book_id"]], memberships.get(ub["_id"], []))}
+            )
+            for ub in batch
+            if ub["book_id"] in books
+        ]
+        if ops:
+            await user_books_collection.bulk_write(ops, ordered=False)
+            await bump_user_versions({ub["user_id"] for ub in batch})
+
+        total += len(batch)
+        last_id = batch[-1]["_id"]
+        query = {"_id": {"$gt": last_id}}
+        rate = total / max(time.monotonic() - started, 1e-9)
+        print(f"  {total:,} user_books | {rate:,.0f} docs/s | last _id {last_id}")
+
+    print(f"✅ Backfilled {total:,} user_books")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute derived user_books fields")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--after", help="Resume after this user_books _id")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size, args.after))
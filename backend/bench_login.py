@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+import httpx
+
+## ---------------------------------------------------------------------------- ##
+## LOGIN BENCHMARK: login throughput and other-endpoint latency under bcrypt    ##
+##                                                                              ##
+##   uvicorn app.main:app &                                                     ##
+##   python bench_login.py --url http://localhost:8000 --concurrency 64         ##
+##                                                                              ##
+## Registers throwaway users (bench-<hex>@example.com), saturates /auth/login   ##
+## and probes GET / at a fixed interval to show event-loop stalls.              ##
+## ---------------------------------------------------------------------------- ##
+
+PASSWORD = "bench-password"
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summary(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 99) * 1000, 1),
+        "max_ms": round(max(samples, default=0) * 1000, 1),
+    }
+
+
+async def register_users(client, n):
+    emails = [f"bench-{uuid4().hex[:12]}@example.com" for _ in range(n)]
+    for email in emails:
+        r = await client.post("/auth/register", json={"email": email, "password": PASSWORD})
+        r.raise_for_status()
+    return emails
+
+
+async def login_worker(client, emails, deadline, results):
+    i = 0
+    while time.perf_counter() < deadline:
+        email = emails[i % len(emails)]
+        i += 1
+        start = time.perf_counter()
+        r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        elapsed = time.perf_counter() - start
+        if r.status_code == 200:
+            results["ok"].append(elapsed)
+        elif r.status_code == 503:
+            results["rejected"] += 1
+            await asyncio.sleep(float(r.headers.get("retry-after", "1")))
+        else:
+            results["errors"] += 1
+
+
+async def probe(client, deadline, interval, samples):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get("/")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits) as client:
+        emails = await register_users(client, args.users)
+
+        idle = []
+        await probe(client, time.perf_counter() + 2, args.probe_interval, idle)
+
+        results = {"ok": [], "rejected": 0, "errors": 0}
+        loaded = []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(
+            probe(client, deadline, args.probe_interval, loaded),
+            *(login_worker(client, emails, deadline, results) for _ in range(args.concurrency)),
+        )
+        elapsed = time.perf_counter() - start
+
+    print(f"logins: {len(results['ok'])} ok, {results['rejected']} rejected (503), "
+          f"{results['errors']} errors in {elapsed:.1f}s "
+          f"-> {len(results['ok']) / elapsed:.1f}/s")
+    print(f"  login latency      {summary(results['ok'])}")
+    print(f"  GET / idle         {summary(idle)}")
+    print(f"  GET / under load   {summary(loaded)}")
+    if loaded and idle:
+        print(f"  probe p50 slowdown x{statistics.median(loaded) / max(statistics.median(idle), 1e-6):.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import MONGO_URI, DB_NAME
+from app.utils.find_missing_ids import MEMBERSHIP_INDEX, find_existing_ids
+
+## ---------------------------------------------------------------------------- ##
+## MEMBERSHIP BENCHMARK: whole-library $group vs covered $in probe              ##
+##                                                                              ##
+##   python bench_membership.py --sizes 1000,10000,40000,100000 --request 3     ##
+##                                                                              ##
+## Grows one library in a throwaway database (default: library_bench, dropped   ##
+## at start; names without "bench"/"test" need --yes-drop, the app's DB_NAME is ##
+## always refused) and times "which of these N ids are already in the library?" ##
+## with both approaches at every size. Half of each request's ids are members.  ##
+## ---------------------------------------------------------------------------- ##
+
+
+async def group_missing_ids(input_ids, library_id, coll):
+    """The previous find_missing_ids: collects every member id, then diffs."""
+    pipeline = [
+        {"$match": {"library_id": library_id}},
+        {"$group": {"_id": None, "existingIds": {"$addToSet": "$user_book_id"}}},
+        {"$project": {"_id": 0, "missingIds": {"$setDifference": [input_ids, "$existingIds"]}}},
+    ]
+    result = await coll.aggregate(pipeline).to_list(length=1)
+    return result[0]["missingIds"] if result else list(input_ids)
+
+
+async def probe_missing_ids(input_ids, library_id, coll):
+    existing = await find_existing_ids(input_ids, library_id, coll)
+    return [i for i in input_ids if i not in existing]
+
+
+async def grow(coll, library_id, members: list, size: int):
+    now = datetime.now(timezone.utc)
+    while len(members) < size:
+        batch = [ObjectId() for _ in range(min(5000, size - len(members)))]
+        await coll.insert_many(
+            [{"library_id": library_id, "user_book_id": ub, "added_at": now} for ub in batch],
+            ordered=False
+        )
+        members.extend(batch)
+
+
+async def time_it(fn, requests, library_id, coll):
+    timings = []
+    for input_ids in requests:
+        start = time.perf_counter()
+        await fn(input_ids, library_id, coll)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def probe_explain(db, coll, input_ids, library_id):
+    explain = await db.command({
+        "explain": {
+            "find": coll.name,
+            "filter": {"library_id": library_id, "user_book_id": {"$in": input_ids}},
+            "projection": {"_id": 0, "user_book_id": 1},
+            "hint": dict(MEMBERSHIP_INDEX),
+        },
+        "verbosity": "executionStats",
+    })
+    stats = explain["executionStats"]
+    return stats["totalKeysExamined"], stats["totalDocsExamined"]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark library membership checks")
+    parser.add_argument("--db", default="library_bench")
+    parser.add_argument("--sizes", default="1000,10000,40000,100000")
+    parser.add_argument("--request", type=int, default=3, help="ids per membership check")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--yes-drop", action="store_true",
+                        help="allow dropping a --db whose name has no bench/test marker")
+    args = parser.parse_args()
+
+    if args.db == DB_NAME:
+        raise SystemExit(f"refusing to drop the app database {DB_NAME!r}")
+    if not any(marker in args.db for marker in ("bench", "test")) and not args.yes_drop:
+        raise SystemExit(f"--db {args.db!r} is dropped at start; name it *bench*/*test* or pass --yes-drop")
+
+    client = AsyncIOMotorClient(MONGO_URI)
+    await client.drop_database(args.db)
+    db = client[args.db]
+    coll = db["library_books"]
+    await coll.create_index(MEMBERSHIP_INDEX, unique=True, name="lb_library_userbook_unique_idx")
+
+    rng = random.Random(42)
+    library_id = ObjectId()
+    members: list = []
+
+    print(f"{'members':>8}  {'approach':<6}  {'median ms':>9}  {'p95 ms':>7}  notes")
+    for size in sorted(int(s) for s in args.sizes.split(",")):
+        await grow(coll, library_id, members, size)
+
+        requests = []
+        for _ in range(args.runs):
+            present = rng.sample(members, args.request // 2 or 1)
+            requests.append(present + [ObjectId() for _ in range(args.request - len(present))])
+
+        # Same answer from both before timing anything
+        for input_ids in requests[:5]:
+            assert sorted(await group_missing_ids(input_ids, library_id, coll)) == \
+                sorted(await probe_missing_ids(input_ids, library_id, coll))
+
+        keys, docs = await probe_explain(db, coll, requests[0], library_id)
+        for name, fn, notes in (
+            ("group", group_missing_ids, ""),
+            ("probe", probe_missing_ids, f"keys examined {keys}, docs examined {docs}"),
+        ):
+            timings = sorted(await time_it(fn, requests, library_id, coll))
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{size:>8}  {name:<6}  {statistics.median(timings):>9.2f}  {p95:>7.2f}  {notes}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, TEXT
+
+from app.core.config import MONGO_URI, DB_NAME
+from app.utils.search import (
+    build_search_blob,
+    build_search_terms,
+    build_search_match,
+    resolve_search_mode,
+)
+
+## ---------------------------------------------------------------------------- ##
+## SEARCH BENCHMARK: substring regex vs $text vs prefix on one user's books     ##
+##                                                                              ##
+##   python bench_search.py --books 100000                                      ##
+##                                                                              ##
+## Seeds "bench-user" rows into a throwaway database (default: library_bench).  ##
+## Only those rows are ever deleted (on --reseed, or when fewer than --books    ##
+## exist). Names without "bench"/"test", or the app's DB_NAME, need --yes-drop. ##
+## ---------------------------------------------------------------------------- ##
+
+WORDS = (
+    "dragon shadow river empire winter silent garden harbor crown storm glass "
+    "forest iron wolf night ember whisper tide kingdom mirror journey secret "
+    "ocean mountain stone bridge letter ghost orchard lantern thief machine"
+).split()
+AUTHORS = ["tolkien", "rowling", "austen", "herbert", "le guin", "pratchett",
+           "atwood", "orwell", "gaiman", "christie", "asimov", "murakami"]
+GENRES = ["fantasy", "classic", "science fiction", "mystery", "romance", "history"]
+
+QUERIES = ["tolkien", "dragon empire", "silent garden", "pratchett night", "zzznotfound"]
+
+
+def make_docs(user_id: str, n: int, rng: random.Random):
+    for _ in range(n):
+        book = {
+            "title": " ".join(rng.sample(WORDS, 3)).title(),
+            "authors": [rng.choice(AUTHORS).title()],
+            "categories": [rng.choice(GENRES).title()],
+        }
+        data = {
+            "genres": rng.sample(GENRES, 2),
+            "tags": rng.sample(WORDS, 2),
+            "personal_notes": " ".join(rng.sample(WORDS, 4)),
+        }
+        blob = build_search_blob(book, data)
+        yield {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "book_id": ObjectId(),
+            **data,
+            "search_blob": blob,
+            "search_terms": build_search_terms(blob),
+        }
+
+
+async def seed(coll, user_id: str, n: int):
+    rng = random.Random(42)
+    batch = []
+    for doc in make_docs(user_id, n, rng):
+        batch.append(doc)
+        if len(batch) == 5000:
+            await coll.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await coll.insert_many(batch, ordered=False)
+
+    await coll.create_index([("user_id", ASCENDING), ("search_blob", TEXT)], name="ub_user_searchblob_text_idx")
+    await coll.create_index([("user_id", ASCENDING), ("search_terms", ASCENDING)], name="ub_user_searchterms_idx")
+
+
+async def run_query(coll, user_id: str, q: str, mode: str, limit: int):
+    match = {"user_id": user_id, **build_search_match(q, resolve_search_mode(q, mode))}
+    pipeline = [{"$match": match}, {"$limit": limit}]
+
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        await coll.aggregate(pipeline).to_list(length=None)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    # Count every match (not just one page) to show index selectivity
+    explain = await coll.database.command(
+        "explain",
+        {"find": coll.name, "filter": match},
+        verbosity="executionStats",
+    )
+    stats = explain["executionStats"]
+    return statistics.median(timings), stats["totalKeysExamined"], stats["totalDocsExamined"], stats["nReturned"]
+
+
+async def main(args):
+    client = AsyncIOMotorClient(MONGO_URI)
+    coll = client[args.db].user_books
+    user_id = "bench-user"
+
+    if args.reseed or await coll.count_documents({"user_id": user_id}) < args.books:
+        await coll.delete_many({"user_id": user_id})
+        print(f"Seeding {args.books:,} user_books into {args.db} ...")
+        started = time.monotonic()
+        await seed(coll, user_id, args.books)
+        print(f"  seeded in {time.monotonic() - started:,.1f}s")
+
+    print(f"{'query':<18} {'mode':<10} {'p50 ms':>9} {'keys':>9} {'docs':>9} {'matches':>9}")
+    for q in QUERIES:
+        for mode in ("substring", "text", "prefix"):
+            p50, keys, docs, n = await run_query(coll, user_id, q, mode, args.limit)
+            print(f"{q:<18} {mode:<10} {p50:>9.1f} {keys:>9,} {docs:>9,} {n:>9,}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark user_books search modes")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=21, help="Page size used for timing")
+    parser.add_argument("--db", default="library_bench")
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--yes-drop", action="store_true",
+                        help="allow seeding/deleting bench rows in a --db without a bench/test marker")
+    args = parser.parse_args()
+
+    unmarked = not any(marker in args.db for marker in ("bench", "test"))
+    if (args.db == DB_NAME or unmarked) and not args.yes_drop:
+        raise SystemExit(f"--db {args.db!r} gets bench rows written and deleted; "
+                         f"name it *bench*/*test* or pass --yes-drop")
+    asyncio.run(main(args))
@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import math
+import os
+import random
+import struct
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import MONGO_URI, DB_NAME
+from app.utils.auth import hash_password_sync
+from app.utils.denormalize import book_display_fields
+from app.utils.search import build_search_blob, build_search_terms
+
+## ---------------------------------------------------------------------------- ##
+## SYNTHETIC DATASET for scale testing                                          ##
+##                                                                              ##
+##   python generate_dataset.py --users 100000 --books 1000000 --workers 8      ##
+##   python generate_dataset.py --power-users 20 --power-user-books 50000       ##
+##                                                                              ##
+## Writes users, books, user_books (derived fields included), libraries and     ##
+## library_books straight into --db with unordered insert_many, one process     ##
+## per writer. Everything derives from --seed and the document index, so the    ##
+## same arguments build the same dataset (ids included) with any --workers.     ##
+## Every user logs in as user<N>@example.com / --password.                      ##
+## Indexes are built afterwards (--create-indexes), which is much faster.       ##
+## --drop refuses DB_NAME; names without "bench"/"test" also need --yes-drop    ##
+## ---------------------------------------------------------------------------- ##
+
+WORDS = (
+    "dragon shadow river empire winter silent garden harbor crown storm glass "
+    "forest iron wolf night ember whisper tide kingdom mirror journey secret "
+    "ocean mountain stone bridge letter ghost orchard lantern thief machine "
+    "house city war love death star light dark king queen child road sea fire"
+).split()
+SURNAMES = (
+    "Smith Tolkien Rowling Austen Herbert Guin Pratchett Atwood Orwell Gaiman "
+    "Christie Asimov Murakami Morrison Eco Borges Woolf Dickens Tolstoy Sanderson"
+).split()
+GIVEN = "Anna John Mary Ursula Terry Neil Agatha Isaac Haruki Toni Jane Leo".split()
+GENRES = [
+    "fantasy", "fiction", "mystery", "romance", "science fiction", "classic",
+    "history", "biography", "thriller", "young adult", "poetry", "self help",
+    "philosophy", "horror", "travel", "cooking",
+]
+TAGS = [
+    "favorite", "to reread", "gift", "signed", "book club", "audiobook",
+    "series", "borrowed", "wishlist", "kindle", "paperback", "hardcover",
+    "school", "summer", "comfort", "dnf",
+] + WORDS
+READ_STATUS = (["unread", "completed", "reading"], [0.55, 0.33, 0.12])
+RATINGS = ([None, 1, 2, 3, 4, 5], [0.35, 0.02, 0.05, 0.15, 0.28, 0.15])
+
+KIND_USER, KIND_BOOK, KIND_USER_BOOK, KIND_LIBRARY, KIND_LIBRARY_BOOK = range(1, 6)
+BASE_TIME = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+BOOK_CHUNK = 5000   # books are generated in fixed chunks -> worker-count independent
+USER_CHUNK = 200
+
+
+def oid(kind: int, index: int) -> ObjectId:
+    """Deterministic ObjectId: base timestamp, kind byte, 7-byte index."""
+    return ObjectId(struct.pack(">IB", int(BASE_TIME.timestamp()), kind) + index.to_bytes(7, "big"))
+
+
+def isbn13(n: int) -> str:
+    core = f"979{n:09d}"
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(core))
+    return core + str((10 - total % 10) % 10)
+
+
+def zipf_weights(n: int, s: float = 1.1) -> list:
+    return [1 / (k ** s) for k in range(1, n + 1)]
+
+
+GENRE_WEIGHTS = zipf_weights(len(GENRES))
+TAG_WEIGHTS = zipf_weights(len(TAGS))
+
+
+def pick_distinct(rng: random.Random, population, weights, k: int) -> list:
+    chosen = []
+    while len(chosen) < k:
+        item = rng.choices(population, weights)[0]
+        if item not in chosen:
+            chosen.append(item)
+    return chosen
+
+
+# -------------------- documents --------------------
+@lru_cache(maxsize=200_000)
+def make_book(seed: int, i: int) -> dict:
+    rng = random.Random(f"{seed}:book:{i}")
+    isbn = isbn13(i)
+    return {
+        "_id": oid(KIND_BOOK, i),
+        "isbn_13": isbn,
+        "isbn_10": None,
+        "title": " ".join(rng.sample(WORDS, rng.randint(1, 4))).title(),
+        "authors": [f"{rng.choice(GIVEN)} {rng.choice(SURNAMES)}" for _ in range(rng.choice([1, 1, 1, 2]))],
+        "publisher": f"{rng.choice(SURNAMES)} Press",
+        "published_year": rng.randint(1850, 2025),
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(40, 160))).capitalize() + ".",
+        "categories": [g.title() for g in pick_distinct(rng, GENRES, GENRE_WEIGHTS, rng.randint(1, 2))],
+        "cover_url": f"https://covers.example.com/{isbn}.jpg",
+        "created_at": BASE_TIME,
+    }
+
+
+def books_for_user(rng: random.Random, total_books: int, count: int) -> list:
+    """Distinct book indexes, skewed towards popular (low-index) books."""
+    count = min(count, total_books)
+    if count > total_books // 2:
+        return rng.sample(range(total_books), count)
+    picked = set()
+    while len(picked) < count:
+        picked.add(int(total_books * rng.random() ** 3))
+    return sorted(picked)
+
+
+def is_power_user(args, u: int) -> bool:
+    # Spread evenly over the id space so no single writer gets all of them
+    step = max(args.users // max(args.power_users, 1), 1)
+    return u % step == 0 and u // step < args.power_users
+
+
+def user_book_count(rng: random.Random, args, u: int) -> int:
+    if is_power_user(args, u):
+        return args.power_user_books
+    # Long tail: most users have a few dozen books, some a few thousand
+    return min(int(rng.paretovariate(1.3) * args.min_books_per_user), args.max_books_per_user)
+
+
+def make_user_chunk(args, chunk: int, password_hash: str) -> dict:
+    start = chunk * USER_CHUNK
+    stop = min(start + USER_CHUNK, args.users)
+    docs = {"users": [], "user_books": [], "libraries": [], "library_books": []}
+
+    for u in range(start, stop):
+        rng = random.Random(f"{args.seed}:user:{u}")
+        user_id = oid(KIND_USER, u)
+        docs["users"].append({
+            "_id": user_id,
+            "email": f"user{u}@example.com",
+            "password": password_hash,
+            "data_version": 0,
+        })
+
+        # Libraries: power users get more (and much bigger) ones
+        n_libraries = rng.randint(3, 8) if is_power_user(args, u) else rng.choice([0, 1, 1, 2, 2, 3, 4])
+        libraries = []
+        for li in range(n_libraries):
+            lib_index = u * 16 + li
+            libraries.append({
+                "_id": oid(KIND_LIBRARY, lib_index),
+                "user_id": str(user_id),
+                "name": f"{rng.choice(WORDS).title()} shelf",
+                "is_public": rng.random() < 0.2,
+                "is_default": False,
+                "slug": f"shelf-{lib_index:x}",
+                "created_at": BASE_TIME,
+                "updated_at": BASE_TIME,
+                "data_version": 0,
+            })
+        docs["libraries"].extend(libraries)
+        # Share of the collection that lands in each library
+        shares = [rng.choice([0.05, 0.1, 0.3, 0.6]) for _ in libraries]
+
+        for j, b in enumerate(books_for_user(rng, args.books, user_book_count(rng, args, u))):
+            ub_index = u * 100_000 + j
+            book = make_book(args.seed, b)
+            created = BASE_TIME + timedelta(minutes=rng.randint(0, 60 * 24 * 900))
+            data = {
+                "genres": pick_distinct(rng, GENRES, GENRE_WEIGHTS, rng.choice([0, 1, 1, 2, 3])),
+                "tags": pick_distinct(rng, TAGS, TAG_WEIGHTS, rng.choice([0, 0, 1, 2, 3])),
+                "personal_notes": " ".join(rng.sample(WORDS, rng.randint(2, 8))) if rng.random() < 0.3 else None,
+                "rating": rng.choices(*RATINGS)[0],
+                "read_status": rng.choices(*READ_STATUS)[0],
+            }
+            ub_id = oid(KIND_USER_BOOK, ub_index)
+
+            library_ids = []
+            for li, (lib, share) in enumerate(zip(libraries, shares)):
+                if rng.random() < share:
+                    library_ids.append(lib["_id"])
+                    docs["library_books"].append({
+                        "_id": oid(KIND_LIBRARY_BOOK, ub_index * 16 + li),
+                        "library_id": lib["_id"],
+                        "user_book_id": ub_id,
+                        "added_at": created,
+                    })
+
+            search_blob = build_search_blob(book, data)
+            docs["user_books"].append({
+                "_id": ub_id,
+                "user_id": str(user_id),
+                "book_id": book["_id"],
+                **data,
+                **book_display_fields(book),
+                "search_blob": search_blob,
+                "search_terms": build_search_terms(search_blob),
+                "library_ids": library_ids,
+                "created_at": created,
+                "updated_at": created + timedelta(days=rng.randint(0, 200)),
+            })
+
+    return docs
+
+
+# -------------------- writers --------------------
+async def write_docs(db, collection: str, docs: list, batch_size: int):
+    for i in range(0, len(docs), batch_size):
+        await db[collection].insert_many(docs[i:i + batch_size], ordered=False)
+
+
+async def _write_book_chunks(args, chunks) -> int:
+    db = AsyncIOMotorClient(args.mongo_uri)[args.db]
+    written = 0
+    for chunk in chunks:
+        docs = [make_book(args.seed, i) for i in range(chunk * BOOK_CHUNK, min((chunk + 1) * BOOK_CHUNK, args.books))]
+        make_book.cache_clear()
+        await write_docs(db, "books", docs, args.batch_size)
+        written += len(docs)
+    return written
+
+
+async def _write_user_chunks(args, chunks, password_hash) -> dict:
+    db = AsyncIOMotorClient(args.mongo_uri)[args.db]
+    counts = {"users": 0, "user_books": 0, "libraries": 0, "library_books": 0}
+    for chunk in chunks:
+        docs = make_user_chunk(args, chunk, password_hash)
+        await asyncio.gather(*(
+            write_docs(db, name, batch, args.batch_size)
+            for name, batch in docs.items() if batch
+        ))
+        for name, batch in docs.items():
+            counts[name] += len(batch)
+    return counts
+
+
+def write_book_chunks(args, chunks) -> int:
+    return asyncio.run(_write_book_chunks(args, chunks))
+
+
+def write_user_chunks(args, chunks, password_hash) -> dict:
+    return asyncio.run(_write_user_chunks(args, chunks, password_hash))
+
+
+def run_parallel(pool, fn, args, n_chunks: int, *extra):
+    # Round-robin the fixed-size chunks over the writers
+    futures = [
+        pool.submit(fn, args, list(range(w, n_chunks, args.workers)), *extra)
+        for w in range(args.workers)
+    ]
+    return [f.result() for f in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Library dataset")
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    parser.add_argument("--db", default="library_scaletest")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--power-users", type=int, default=10)
+    parser.add_argument("--power-user-books", type=int, default=50_000)
+    parser.add_argument("--min-books-per-user", type=int, default=20)
+    parser.add_argument("--max-books-per-user", type=int, default=5_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--drop", action="store_true", help="drop --db first")
+    parser.add_argument("--yes-drop", action="store_true",
+                        help="allow --drop on a --db whose name has no bench/test marker")
+    parser.add_argument("--create-indexes", action="store_true", help="run create_indexes.py on --db afterwards")
+    args = parser.parse_args()
+
+    if args.power_user_books >= 100_000:
+        raise SystemExit("--power-user-books must stay below 100000 (user_books id space per user)")
+    if args.drop and args.db == DB_NAME:
+        raise SystemExit(f"refusing to drop the app database {DB_NAME!r}")
+    if args.drop and not any(marker in args.db for marker in ("bench", "test")) and not args.yes_drop:
+        raise SystemExit(f"--drop on --db {args.db!r}: name it *bench*/*test* or pass --yes-drop")
+
+    if args.drop:
+        asyncio.run(AsyncIOMotorClient(args.mongo_uri).drop_database(args.db))
+
+    password_hash = hash_password_sync(args.password)
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        n_chunks = math.ceil(args.books / BOOK_CHUNK)
+        books = sum(run_parallel(pool, write_book_chunks, args, n_chunks))
+        print(f"  books          {books:>12,}  ({time.monotonic() - started:.0f}s)")
+
+        n_chunks = math.ceil(args.users / USER_CHUNK)
+        totals = {}
+        for counts in run_parallel(pool, write_user_chunks, args, n_chunks, password_hash):
+            for name, n in counts.items():
+                totals[name] = totals.get(name, 0) + n
+        for name, n in totals.items():
+            print(f"  {name:<14} {n:>12,}")
+
+    total = books + sum(totals.values())
+    elapsed = time.monotonic() - started
+    print(f"✅ {total:,} documents in {elapsed:.0f}s ({total / max(elapsed, 1e-9):,.0f} docs/s) into {args.db}")
+
+    if args.create_indexes:
+        env = {**os.environ, "MONGO_URI": args.mongo_uri, "DB_NAME": args.db}
+        subprocess.run([sys.executable, "create_indexes.py"], env=env, check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.db.mongodb import books_collection
+from app.providers.base import build_book_doc, parse_year
+from app.utils.denormalize import propagate_book_changes
+from app.utils.isbn import normalize_isbn
+
+## ---------------------------------------------------------------------------- ##
+## BULK-LOAD A BIBLIOGRAPHIC DUMP INTO THE SHARED `books` COLLECTION            ##
+##                                                                              ##
+##   python import_catalog.py ol_dump_editions.txt.gz                           ##
+##   python import_catalog.py books.csv --batch-size 2000                       ##
+##                                                                              ##
+## Re-running the same command resumes from <dump>.checkpoint.                  ##
+## ---------------------------------------------------------------------------- ##
+
+OL_COVER_URL = "https://covers.openlibrary.org/b/id/{}-M.jpg"
+
+
+def open_text(path: str):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _names(items) -> list:
+    names = []
+    for item in items or []:
+        if isinstance(item, dict):
+            item = item.get("name")
+        if isinstance(item, str) and item:
+            names.append(item)
+    return names
+
+
+def _split(value: str) -> list:
+    if not value:
+        return []
+    sep = ";" if ";" in value else "|"
+    return [v.strip() for v in value.split(sep) if v.strip()]
+
+
+# -------------------- row parsers --------------------
+# Each parser maps one source row to (raw_isbn, metadata) or None.
+
+def parse_jsonl_row(line: str):
+    line = line.strip()
+    if not line:
+        return None
+    # Open Library dumps are "type\tkey\trevision\tlast_modified\t{json}"
+    if not line.startswith("{"):
+        line = line.rsplit("\t", 1)[-1]
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return None
+
+    isbns = rec.get("isbn_13") or rec.get("isbn_10") or rec.get("isbn") or []
+    if isinstance(isbns, str):
+        isbns = [isbns]
+    if not isbns or not rec.get("title"):
+        return None
+
+    title = rec["title"]
+    if rec.get("subtitle"):
+        title = f"{title}: {rec['subtitle']}"
+
+    description = rec.get("description")
+    if isinstance(description, dict):
+        description = description.get("value")
+
+    covers = [c for c in rec.get("covers") or [] if isinstance(c, int) and c > 0]
+    publishers = _names(rec.get("publishers"))
+
+    return isbns[0], {
+        "title": title,
+        "authors": _names(rec.get("authors")) or _split(rec.get("by_statement", "")),
+        "publisher": publishers[0] if publishers else None,
+        "published_year": parse_year(rec.get("publish_date")),
+        "description": description,
+        "categories": _names(rec.get("subjects"))[:10],
+        "cover_url": OL_COVER_URL.format(covers[0]) if covers else None,
+    }
+
+
+def parse_csv_row(row: dict):
+    row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+    isbn = row.get("isbn_13") or row.get("isbn13") or row.get("isbn") or row.get("isbn_10")
+    if not isbn or not row.get("title"):
+        return None
+
+    return isbn, {
+        "title": row["title"],
+        "authors": _split(row.get("authors") or row.get("author", "")),
+        "publisher": row.get("publisher") or None,
+        "published_year": parse_year(row.get("published_year") or row.get("publication_date")),
+        "description": row.get("description") or None,
+        "categories": _split(row.get("categories", "")),
+        "cover_url": row.get("cover_url") or None,
+    }
+
+
+def iter_rows(f, fmt: str):
+    if fmt == "csv":
+        for row in csv.DictReader(f):
+            yield row, parse_csv_row
+    else:
+        for line in f:
+            yield line, parse_jsonl_row
+
+
+# -------------------- checkpoint --------------------
+def load_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"rows": 0, "upserted": 0, "skipped": 0}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: dict):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+# -------------------- import --------------------
+def build_op(raw_isbn: str, meta: dict, update_existing: bool):
+    try:
+        isbn_13 = normalize_isbn(raw_isbn)
+    except Exception:
+        return None
+
+    doc = build_book_doc(raw_isbn.replace("-", "").strip(), isbn_13, meta)
+    if update_existing:
+        # Overwrite only what this row actually carries; a 13-digit row or a
+        # feed without descriptions must not null out what the book already has.
+        # Empty fields still give a new book its full shape via $setOnInsert.
+        present = {k: v for k, v in doc.items() if v not in (None, "", []) and k != "created_at"}
+        absent = {k: v for k, v in doc.items() if k not in present}
+        update = {"$set": present, "$setOnInsert": absent}
+    else:
+        update = {"$setOnInsert": doc}
+
+    return isbn_13, UpdateOne({"isbn_13": isbn_13}, update, upsert=True)
+
+
+async def write_batch(isbns: list, ops: list, update_existing: bool = False) -> tuple:
+    try:
+        res = await books_collection.bulk_write(ops, ordered=False)
+        written, errors = res.upserted_count + res.modified_count, 0
+        inserted = set(res.upserted_ids)
+        modified = res.modified_count
+    except BulkWriteError as e:
+        details = e.details
+        written = details.get("nUpserted", 0) + details.get("nModified", 0)
+        errors = len(details.get("writeErrors", []))
+        inserted = {u["index"] for u in details.get("upserted", [])}
+        modified = details.get("nModified", 0)
+
+    # Existing books were overwritten: refresh the copies held in user_books
+    if update_existing and modified:
+        existing = [isbn for i, isbn in enumerate(isbns) if i not in inserted]
+        book_ids = await books_collection.distinct("_id", {"isbn_13": {"$in": existing}})
+        await propagate_book_changes(book_ids)
+
+    return written, errors
+
+
+async def import_catalog(args):
+    fmt = args.format
+    if fmt == "auto":
+        fmt = "csv" if ".csv" in os.path.basename(args.path) else "jsonl"
+
+    checkpoint_path = args.checkpoint or f"{args.path}.checkpoint"
+    state = {"rows": 0, "upserted": 0, "skipped": 0} if args.restart else load_checkpoint(checkpoint_path)
+    resume_from = state["rows"]
+    if resume_from:
+        print(f"↪ Resuming after row {resume_from:,}")
+
+    started = time.monotonic()
+    last_report = started
+    rows_this_run = 0
+    batch: dict = {}  # isbn_13 -> UpdateOne (dedupes within a batch)
+    batch_skipped = 0  # unparseable rows since the last cut, committed with that batch
+    in_flight = None  # (task, rows consumed when the batch was cut, its unparseable rows)
+    # Totals for rows read by this run only; `state` holds the checkpointed totals,
+    # which only ever include rows at or before state["rows"]
+    run = {"upserted": 0, "skipped": 0}
+
+    async def flush(rows_consumed: int):
+        nonlocal in_flight, batch, batch_skipped
+        # Keep one write in flight while the next batch is parsed
+        if in_flight:
+            await commit_in_flight()
+        if batch:
+            task = asyncio.ensure_future(
+                write_batch(list(batch), list(batch.values()), args.update_existing)
+            )
+            in_flight = (task, rows_consumed, batch_skipped)
+            batch = {}
+            # The parse loop never awaits: yield once so the task starts and Motor
+            # hands bulk_write to its thread before we go back to parsing
+            await asyncio.sleep(0)
+        else:
+            commit(rows_consumed, 0, batch_skipped)
+        batch_skipped = 0
+
+    async def commit_in_flight():
+        nonlocal in_flight
+        task, rows_consumed, parse_skipped = in_flight
+        in_flight = None
+        written, errors = await task
+        commit(rows_consumed, written, parse_skipped + errors)
+
+    def commit(rows_consumed: int, written: int, skipped: int):
+        for totals in (state, run):
+            totals["upserted"] += written
+            totals["skipped"] += skipped
+        state["rows"] = rows_consumed
+        save_checkpoint(checkpoint_path, state)
+
+    with open_text(args.path) as f:
+        for row_no, (raw, parse) in enumerate(iter_rows(f, fmt), start=1):
+            if row_no <= resume_from:
+                continue
+            if args.limit and rows_this_run >= args.limit:
+                break
+            rows_this_run += 1
+
+            parsed = parse(raw)
+            op = build_op(*parsed, args.update_existing) if parsed else None
+            if op is None:
+                batch_skipped += 1
+            else:
+                batch[op[0]] = op[1]
+
+            if len(batch) >= args.batch_size:
+                await flush(row_no)
+
+            now = time.monotonic()
+            if now - last_report >= args.report_every:
+                rate = rows_this_run / (now - started)
+                print(f"  {resume_from + rows_this_run:,} rows | {rate:,.0f} rows/s | "
+                      f"upserted {run['upserted']:,} | skipped {run['skipped']:,}")
+                last_report = now
+
+        await flush(resume_from + rows_this_run)
+        if in_flight:
+            await commit_in_flight()
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    print(f"✅ Imported {rows_this_run:,} rows in {elapsed:,.1f}s "
+          f"({rows_this_run / elapsed:,.0f} rows/s) | upserted {run['upserted']:,} | "
+          f"skipped {run['skipped']:,} | checkpoint: {checkpoint_path}")
+    if resume_from:
+        print(f"   All runs: {state['rows']:,} rows | upserted {state['upserted']:,} | "
+              f"skipped {state['skipped']:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import a catalog dump into books")
+    parser.add_argument("path", help="JSONL / Open Library dump / CSV file (optionally .gz)")
+    parser.add_argument("--format", choices=["auto", "jsonl", "csv"], default="auto")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--update-existing", action="store_true",
+                        help="Overwrite metadata of books that already exist")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after N rows (0 = all)")
+    parser.add_argument("--report-every", type=float, default=5.0, help="Seconds between progress lines")
+    asyncio.run(import_catalog(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+## ---------------------------------------------------------------------------- ##
+## LOAD TEST: the real endpoint mix against a local mongod                      ##
+##                                                                              ##
+##   python loadtest.py --concurrency 32 --duration 60 --out before.json        ##
+##   python loadtest.py --start-mongod ...     # throwaway mongod in a tmp dir  ##
+##   python loadtest.py --url http://host:8000 # server already running         ##
+##                                                                              ##
+## Without --url the app is started with uvicorn against --db (default          ##
+## library_loadtest), which is dropped and reseeded on every run. There is no   ##
+## in-memory stand-in: text search, $lookup and keyset pagination need mongod.  ##
+## The JSON report has throughput and p50/p95/p99 per route, so two runs can    ##
+## be diffed across commits.                                                    ##
+## ---------------------------------------------------------------------------- ##
+
+PASSWORD = "loadtest-password"
+
+WORDS = (
+    "dragon shadow river empire winter silent garden harbor crown storm glass "
+    "forest iron wolf night ember whisper tide kingdom mirror journey secret "
+    "ocean mountain stone bridge letter ghost orchard lantern thief machine"
+).split()
+AUTHORS = ["Tolkien", "Rowling", "Austen", "Herbert", "Le Guin", "Pratchett",
+           "Atwood", "Orwell", "Gaiman", "Christie", "Asimov", "Murakami"]
+GENRES = ["fantasy", "classic", "science fiction", "mystery", "romance", "history"]
+READ_STATUS = ["unread", "reading", "completed"]
+
+DEFAULT_MIX = "scan=15,add=10,list=30,library=20,public=15,login=5"
+
+
+def isbn13(n: int) -> str:
+    core = f"979{n:09d}"
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(core))
+    return core + str((10 - total % 10) % 10)
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"unknown operation in --mix: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+# -------------------- infrastructure --------------------
+def start_mongod(port: int):
+    if not shutil.which("mongod"):
+        raise SystemExit("--start-mongod needs a mongod binary on PATH")
+    dbpath = tempfile.mkdtemp(prefix="loadtest-mongod-")
+    proc = subprocess.Popen(
+        ["mongod", "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL,
+    )
+    return proc, dbpath
+
+
+def start_app(args):
+    env = {
+        **os.environ,
+        "MONGO_URI": args.mongo_uri,
+        "DB_NAME": args.db,
+        # Seeded ISBNs are all in the db; never call out to real providers
+        "ISBN_PROVIDERS": "",
+    }
+    env.setdefault("SECRET_KEY", "loadtest-secret")
+    env.setdefault("ALGORITHM", "HS256")
+    env.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "120")
+
+    subprocess.run([sys.executable, "create_indexes.py"], env=env, check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+async def wait_until_up(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise SystemExit("app did not come up")
+
+
+# -------------------- seeding --------------------
+async def seed(client: httpx.AsyncClient, db, args, rng: random.Random) -> dict:
+    if args.db == "library":
+        raise SystemExit("refusing to drop the main 'library' database")
+    for name in ("books", "users", "user_books", "libraries", "library_books", "public_library_items"):
+        await db[name].delete_many({})
+
+    isbns = [isbn13(i) for i in range(args.books)]
+    now = datetime.now(timezone.utc)
+    await db.books.insert_many([
+        {
+            "isbn_13": isbn,
+            "isbn_10": None,
+            "title": " ".join(rng.sample(WORDS, 3)).title(),
+            "authors": [rng.choice(AUTHORS)],
+            "publisher": "Loadtest Press",
+            "published_year": rng.randint(1900, 2024),
+            "description": " ".join(rng.choices(WORDS, k=80)),
+            "categories": [rng.choice(GENRES).title()],
+            "cover_url": f"https://covers.example.com/{isbn}.jpg",
+            "created_at": now,
+        }
+        for isbn in isbns
+    ])
+
+    users = []
+    for u in range(args.users):
+        email = f"loadtest-{u}@example.com"
+        (await client.post("/auth/register", json={"email": email, "password": PASSWORD})).raise_for_status()
+        r = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        owned = rng.sample(isbns, min(args.books_per_user, len(isbns)))
+        for i in range(0, len(owned), 1000):
+            items = [
+                {
+                    "isbn": isbn,
+                    "genres": rng.sample(GENRES, 2),
+                    "tags": rng.sample(WORDS, 2),
+                    "personal_notes": " ".join(rng.sample(WORDS, 4)),
+                    "rating": rng.randint(1, 5),
+                    "read_status": rng.choice(READ_STATUS),
+                }
+                for isbn in owned[i:i + 1000]
+            ]
+            (await client.post("/books/bulk", json={"items": items}, headers=headers)).raise_for_status()
+
+        for li in range(args.libraries_per_user):
+            body = {"name": f"Shelf {li}", "is_public": li == 0}
+            (await client.post("/library", json=body, headers=headers)).raise_for_status()
+        libraries = (await client.get("/library", headers=headers)).json()
+
+        user_id = (await db.users.find_one({"email": email}))["_id"]
+        user_book_ids = [str(d["_id"]) async for d in db.user_books.find({"user_id": str(user_id)}, {"_id": 1})]
+        for lib in libraries:
+            members = rng.sample(user_book_ids, len(user_book_ids) // 2)
+            for i in range(0, len(members), 500):
+                r = await client.post(f"/librarybooks/{lib['id']}", json={"user_book_ids": members[i:i + 500]},
+                                      headers=headers)
+                r.raise_for_status()
+
+        users.append({
+            "email": email,
+            "headers": headers,
+            "libraries": [lib["id"] for lib in libraries],
+            "public_slugs": [lib["slug"] for lib in libraries if lib["is_public"]],
+        })
+
+    return {"isbns": isbns, "users": users}
+
+
+# -------------------- operations --------------------
+async def op_scan(client, user, world, rng):
+    return "GET /isbn", await client.get("/isbn", params={"isbn": rng.choice(world["isbns"])})
+
+
+async def op_add(client, user, world, rng):
+    body = {"genres": [rng.choice(GENRES)], "rating": rng.randint(1, 5), "read_status": rng.choice(READ_STATUS)}
+    return "POST /books/{isbn}", await client.post(
+        f"/books/{rng.choice(world['isbns'])}", json=body, headers=user["headers"])
+
+
+async def op_list(client, user, world, rng):
+    params = {"sort": rng.choice(["updated_at", "rating", "title"]), "limit": 20}
+    filters = rng.choice(["none", "genre", "status", "rating", "search"])
+    if filters == "genre":
+        params["genre"] = rng.choice(GENRES)
+    elif filters == "status":
+        params["read_status"] = rng.choice(READ_STATUS)
+    elif filters == "rating":
+        params["min_rating"] = rng.randint(2, 5)
+    elif filters == "search":
+        params["q"] = rng.choice(WORDS + AUTHORS)
+    return "GET /books", await client.get("/books", params=params, headers=user["headers"])
+
+
+async def op_library(client, user, world, rng):
+    return "GET /librarybooks/{library_id}", await client.get(
+        f"/librarybooks/{rng.choice(user['libraries'])}",
+        params={"sort": rng.choice(["updated_at", "rating", "title"])},
+        headers=user["headers"])
+
+
+async def op_public(client, user, world, rng):
+    slugs = [s for u in world["users"] for s in u["public_slugs"]]
+    return "GET /public/library/{slug}", await client.get(f"/public/library/{rng.choice(slugs)}")
+
+
+async def op_login(client, user, world, rng):
+    return "POST /auth/login", await client.post(
+        "/auth/login", json={"email": user["email"], "password": PASSWORD})
+
+
+OPERATIONS = {
+    "scan": op_scan,
+    "add": op_add,
+    "list": op_list,
+    "library": op_library,
+    "public": op_public,
+    "login": op_login,
+}
+
+
+async def worker(client, world, mix, deadline, warmup_until, seed_value, samples, errors):
+    rng = random.Random(seed_value)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        op = OPERATIONS[rng.choices(names, weights)[0]]
+        user = rng.choice(world["users"])
+        start = time.perf_counter()
+        try:
+            route, r = await op(client, user, world, rng)
+            ok = r.status_code < 400
+        except httpx.HTTPError:
+            route, ok = op.__name__, False
+        elapsed = time.perf_counter() - start
+        if start < warmup_until:
+            continue
+        samples[route].append(elapsed)
+        if not ok:
+            errors[route] += 1
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(samples, errors, measured_for, args, mix) -> dict:
+    routes = {}
+    for route in sorted(samples):
+        ordered = sorted(samples[route])
+        routes[route] = {
+            "requests": len(ordered),
+            "errors": errors[route],
+            "rps": round(len(ordered) / measured_for, 2),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        }
+    everything = sorted(s for v in samples.values() for s in v)
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "users": args.users,
+            "books": args.books,
+            "books_per_user": args.books_per_user,
+            "libraries_per_user": args.libraries_per_user,
+            "mix": mix,
+        },
+        "total": {
+            "requests": len(everything),
+            "errors": sum(errors.values()),
+            "rps": round(len(everything) / measured_for, 2),
+            "p50_ms": round(percentile(everything, 50) * 1000, 2),
+            "p95_ms": round(percentile(everything, 95) * 1000, 2),
+            "p99_ms": round(percentile(everything, 99) * 1000, 2),
+        },
+        "routes": routes,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test for the Library API")
+    parser.add_argument("--url", help="use an already running server instead of starting one")
+    parser.add_argument("--mongo-uri", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--db", default="library_loadtest")
+    parser.add_argument("--start-mongod", action="store_true")
+    parser.add_argument("--mongod-port", type=int, default=27099)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--books-per-user", type=int, default=1000)
+    parser.add_argument("--libraries-per-user", type=int, default=3)
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data from a previous run")
+    parser.add_argument("--out", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    procs = []
+    dbpath = None
+    try:
+        if args.start_mongod:
+            mongod, dbpath = start_mongod(args.mongod_port)
+            procs.append(mongod)
+            args.mongo_uri = f"mongodb://127.0.0.1:{args.mongod_port}"
+            await asyncio.sleep(2)
+
+        url = args.url
+        if not url:
+            procs.append(start_app(args))
+            url = f"http://127.0.0.1:{args.port}"
+
+        limits = httpx.Limits(max_connections=args.concurrency + 8)
+        async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+            await wait_until_up(client)
+            db = AsyncIOMotorClient(args.mongo_uri)[args.db]
+            rng = random.Random(args.seed)
+
+            # Tokens and ids from the last seed, so --skip-seed can reuse the db
+            world_path = f".{args.db}.world.json"
+            if args.skip_seed:
+                if not os.path.exists(world_path):
+                    raise SystemExit("--skip-seed needs a previous seeded run")
+                with open(world_path) as f:
+                    world = json.load(f)
+            else:
+                print(f"seeding {args.users} users x {args.books_per_user} books ...", file=sys.stderr)
+                world = await seed(client, db, args, rng)
+                with open(world_path, "w") as f:
+                    json.dump(world, f)
+
+            # Seeds without a public library would make op_public raise on rng.choice([])
+            if mix.get("public") and not any(u["public_slugs"] for u in world["users"]):
+                print("no public libraries seeded, dropping 'public' from --mix", file=sys.stderr)
+                mix = {name: weight for name, weight in mix.items() if name != "public"}
+                if not any(mix.values()):
+                    raise SystemExit("--mix has no runnable operations left")
+
+            print(f"running {args.duration}s at concurrency {args.concurrency} ...", file=sys.stderr)
+            samples, errors = defaultdict(list), defaultdict(int)
+            start = time.perf_counter()
+            warmup_until = start + args.warmup
+            deadline = warmup_until + args.duration
+            await asyncio.gather(*(
+                worker(client, world, mix, deadline, warmup_until, args.seed + i, samples, errors)
+                for i in range(args.concurrency)
+            ))
+
+        result = report(samples, errors, args.duration, args, mix)
+        output = json.dumps(result, indent=2)
+        print(output)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(output + "\n")
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            proc.wait(timeout=10)
+        if dbpath:
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
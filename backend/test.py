@@ -114,25 +114,27 @@ books = [
     },
 ]
 
-for book in books:
-    url = f"{BASE_URL}/{book['isbn']}"
+# One request for the whole batch (POST /books/bulk) instead of one per book
+url = f"{BASE_URL}/bulk"
+payload = {"items": [{"isbn": book["isbn"], **book["payload"]} for book in books]}
 
-    try:
-        response = requests.post(
-            url,
-            json=book["payload"],
-            headers=HEADERS,
-            timeout=10
-        )
+try:
+    response = requests.post(
+        url,
+        json=payload,
+        headers=HEADERS,
+        timeout=30
+    )
 
-        print(f"\nPOST {url}")
-        print(f"Status: {response.status_code}")
+    print(f"\nPOST {url}")
+    print(f"Status: {response.status_code}")
 
-        if response.headers.get("content-type", "").startswith("application/json"):
-            print("Response:", response.json())
-        else:
-            print("Response:", response.text)
+    if response.headers.get("content-type", "").startswith("application/json"):
+        for result in response.json().get("results", []):
+            print(f"  {result['isbn']}: {result['status']}")
+    else:
+        print("Response:", response.text)
 
-    except requests.RequestException as e:
-        print(f"\nPOST {url}")
-        print("Request failed:", e)
+except requests.RequestException as e:
+    print(f"\nPOST {url}")
+    print("Request failed:", e)
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.utils.auth import HashingPool, HashingPoolBusy
+
+
+@pytest.mark.anyio
+async def test_admission_limit():
+    pool = HashingPool(workers=1, queue_limit=1)
+    release = threading.Event()
+    waiters = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(HashingPoolBusy):
+        await pool.run(lambda: None)
+
+    release.set()
+    await asyncio.gather(*waiters)
+    assert pool.stats()["outstanding"] == 0
+    assert pool.stats()["rejected"] == 1
+    pool.shutdown()
+
+
+@pytest.mark.anyio
+async def test_cancelled_caller_keeps_slot_until_thread_finishes():
+    pool = HashingPool(workers=1, queue_limit=0)
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait()
+
+    waiter = asyncio.ensure_future(pool.run(work))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    # The bcrypt thread is still busy, so the slot is still taken
+    assert pool.stats()["outstanding"] == 1
+    with pytest.raises(HashingPoolBusy):
+        await pool.run(lambda: None)
+
+    release.set()
+    for _ in range(100):
+        if pool.stats()["outstanding"] == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert pool.stats()["outstanding"] == 0
+    assert await pool.run(lambda: "ok") == "ok"
+    pool.shutdown()
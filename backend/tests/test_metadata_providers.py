@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import httpx
+import pytest
+
+from app.providers import GoogleBooksProvider, OpenLibraryProvider, ProviderUnavailable
+from app.providers import hedged
+from app.providers.base import CircuitBreaker
+from app.providers.hedged import HedgedLookup
+
+ISBN = "9780132350884"
+CLIENT_TIMEOUT = 0.3
+
+GOOGLE_HIT = {
+    "totalItems": 1,
+    "items": [{"volumeInfo": {"title": "Clean Code", "authors": ["Robert C. Martin"], "publishedDate": "2008-08-01"}}],
+}
+OPEN_LIBRARY_HIT = {
+    f"ISBN:{ISBN}": {"title": "Clean Code (OL)", "authors": [{"name": "Robert C. Martin"}], "publish_date": "2008"},
+}
+
+
+# -------------------- stub provider server --------------------
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        route = urlparse(self.path).path.strip("/")
+        self.server.hits[route] = self.server.hits.get(route, 0) + 1
+        status, body, delay = self.server.routes[route]
+        time.sleep(delay)
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client timed out and hung up
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.routes = {}  # route -> (status, json body, delay seconds)
+    server.hits = {}
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+async def http_client(monkeypatch):
+    client = httpx.AsyncClient(timeout=CLIENT_TIMEOUT)
+    monkeypatch.setattr(hedged, "get_http_client", lambda: client)
+    yield client
+    await client.aclose()
+
+
+def make_lookup(server, max_delay=5.0, failure_threshold=5):
+    providers = [
+        GoogleBooksProvider(url=f"{server.base_url}/google"),
+        OpenLibraryProvider(url=f"{server.base_url}/openlibrary"),
+    ]
+    for provider in providers:
+        provider.breaker = CircuitBreaker(failure_threshold, reset_timeout=60)
+    return HedgedLookup(providers, min_delay=0.01, max_delay=max_delay)
+
+
+# -------------------- fallback chain --------------------
+@pytest.mark.anyio
+async def test_primary_answers(stub_server, http_client):
+    stub_server.routes = {"google": (200, GOOGLE_HIT, 0), "openlibrary": (200, OPEN_LIBRARY_HIT, 0)}
+    lookup = make_lookup(stub_server)
+
+    info = await lookup.lookup(ISBN)
+
+    assert info["title"] == "Clean Code"
+    assert info["published_year"] == 2008
+    assert stub_server.hits == {"google": 1}
+
+
+@pytest.mark.anyio
+async def test_primary_timeout_falls_back(stub_server, http_client):
+    # Hedge delay is far above the client timeout, so the fallback is the timeout's doing
+    stub_server.routes = {"google": (200, GOOGLE_HIT, 1.0), "openlibrary": (200, OPEN_LIBRARY_HIT, 0)}
+    lookup = make_lookup(stub_server, max_delay=5.0)
+
+    info = await lookup.lookup(ISBN)
+
+    assert info["title"] == "Clean Code (OL)"
+    assert info["authors"] == ["Robert C. Martin"]
+    assert lookup.providers[0].breaker.failures == 1
+    assert lookup.providers[1].breaker.failures == 0
+
+
+@pytest.mark.anyio
+async def test_primary_error_falls_back(stub_server, http_client):
+    stub_server.routes = {"google": (429, {"error": "quota"}, 0), "openlibrary": (200, OPEN_LIBRARY_HIT, 0)}
+    lookup = make_lookup(stub_server)
+
+    info = await lookup.lookup(ISBN)
+
+    assert info["title"] == "Clean Code (OL)"
+    assert lookup.providers[0].breaker.failures == 1
+
+
+@pytest.mark.anyio
+async def test_slow_primary_is_hedged(stub_server, http_client, monkeypatch):
+    # Slower than the hedge delay but inside the client timeout
+    monkeypatch.setattr(http_client, "timeout", httpx.Timeout(2.0))
+    stub_server.routes = {"google": (200, GOOGLE_HIT, 0.8), "openlibrary": (200, OPEN_LIBRARY_HIT, 0)}
+    lookup = make_lookup(stub_server, max_delay=0.05)
+
+    started = time.monotonic()
+    info = await lookup.lookup(ISBN)
+
+    assert info["title"] == "Clean Code (OL)"
+    assert time.monotonic() - started < 0.8
+    # The losing call is abandoned, not counted as a failure
+    assert lookup.providers[0].breaker.failures == 0
+
+
+@pytest.mark.anyio
+async def test_all_providers_fail(stub_server, http_client):
+    stub_server.routes = {"google": (500, {}, 0), "openlibrary": (200, OPEN_LIBRARY_HIT, 1.0)}
+    lookup = make_lookup(stub_server)
+
+    with pytest.raises(httpx.TimeoutException):
+        await lookup.lookup(ISBN)
+
+    assert [p.breaker.failures for p in lookup.providers] == [1, 1]
+
+
+@pytest.mark.anyio
+async def test_not_found_everywhere(stub_server, http_client):
+    stub_server.routes = {"google": (200, {"totalItems": 0}, 0), "openlibrary": (200, {}, 0)}
+    lookup = make_lookup(stub_server)
+
+    assert await lookup.lookup(ISBN) is None
+    assert stub_server.hits == {"google": 1, "openlibrary": 1}
+
+
+# -------------------- circuit breaker --------------------
+@pytest.mark.anyio
+async def test_open_circuit_is_skipped(stub_server, http_client):
+    stub_server.routes = {"google": (503, {}, 0), "openlibrary": (200, OPEN_LIBRARY_HIT, 0)}
+    lookup = make_lookup(stub_server, failure_threshold=1)
+
+    await lookup.lookup(ISBN)
+    assert lookup.providers[0].breaker.state == "open"
+
+    info = await lookup.lookup(ISBN)
+
+    assert info["title"] == "Clean Code (OL)"
+    assert stub_server.hits == {"google": 1, "openlibrary": 2}
+
+
+@pytest.mark.anyio
+async def test_every_circuit_open(stub_server, http_client):
+    stub_server.routes = {"google": (503, {}, 0), "openlibrary": (503, {}, 0)}
+    lookup = make_lookup(stub_server, failure_threshold=1)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await lookup.lookup(ISBN)
+    with pytest.raises(ProviderUnavailable):
+        await lookup.lookup(ISBN)
+
+    assert stub_server.hits == {"google": 1, "openlibrary": 1}
@@ -0,0 +1,77 @@
+import random
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+
+from app.utils.pagination import USER_BOOK_SORT_FIELDS, keyset_page_stages, next_page_cursor
+
+USER_ID = "user-1"
+SEEDS = range(8)
+
+# Few distinct values so ties (and runs of null/missing) are common
+VALUES = {
+    "updated_at": [datetime(2024, 1, 1) + timedelta(minutes=m) for m in range(5)],
+    "rating": [1, 2, 3, 4, 5],
+    "book_title_sort": ["alpha", "beta", "gamma", "delta"],
+    "_score": [0.5, 0.75, 1.0, 1.5],
+}
+
+
+def make_docs(rng: random.Random, n: int) -> list:
+    docs = []
+    for _ in range(n):
+        doc = {"_id": ObjectId(), "user_id": USER_ID}
+        for field, values in VALUES.items():
+            roll = rng.random()
+            if roll < 0.15:
+                continue            # missing
+            doc[field] = None if roll < 0.3 else rng.choice(values)
+        docs.append(doc)
+    # Another user's rows must never leak into the walk
+    docs.append({"_id": ObjectId(), "user_id": "someone-else", "rating": 3})
+    return docs
+
+
+def expected_order(docs: list, field: str, direction: int) -> list:
+    # MongoDB orders null/missing below every other value, ties broken by _id
+    def key(doc):
+        value = doc.get(field)
+        return (value is not None, value if value is not None else 0, doc["_id"])
+    ordered = sorted((d for d in docs if d["user_id"] == USER_ID), key=key, reverse=direction == -1)
+    return [d["_id"] for d in ordered]
+
+
+def walk(coll, sort: str, order: str, rng: random.Random) -> list:
+    seen, cursor = [], None
+    while True:
+        limit = rng.randint(1, 7)
+        stages = keyset_page_stages(sort, order, cursor, limit)
+        if sort == "relevance":
+            # _score is seeded on the documents; $meta needs a real $text query
+            stages = [s for s in stages if "$addFields" not in s]
+        docs = list(coll.aggregate([{"$match": {"user_id": USER_ID}}, *stages]))
+        cursor = next_page_cursor(docs, limit, sort, order)
+        assert len(docs) <= limit
+        seen.extend(d["_id"] for d in docs)
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("sort", list(USER_BOOK_SORT_FIELDS))
+def test_pages_concatenate_to_full_order(sort, order, seed):
+    rng = random.Random(f"{sort}-{order}-{seed}")
+    docs = make_docs(rng, rng.randint(0, 60))
+    coll = mongomock.MongoClient().db.user_books
+    if docs:
+        coll.insert_many(docs)
+
+    seen = walk(coll, sort, order, rng)
+
+    direction = -1 if order == "desc" or sort == "relevance" else 1
+    expected = expected_order(docs, USER_BOOK_SORT_FIELDS[sort], direction)
+    assert len(seen) == len(set(seen)), "duplicate rows across pages"
+    assert seen == expected, "pages do not concatenate to the full sorted set"